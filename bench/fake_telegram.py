@@ -0,0 +1,240 @@
+"""
+Local stand-in for the Telegram side of the stream server.
+
+FakeTelegram serves upload.GetFile from local files through FakeClient and
+FakeSession objects with configurable latency, per-session bandwidth and error
+rates. install() puts the fake clients in multi_clients and keeps the FileId
+index in memory, so ByteStreamer, media_streamer and web_server() run unchanged.
+MTProto encryption isn't emulated, so CPU numbers measured on it leave out the
+cost of tgcrypto.
+"""
+import os
+import random
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List
+
+# the project modules read their configuration at import time
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "bench")
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+os.environ.setdefault("DATABASE_URI", "mongodb://localhost:1")
+
+from pyrogram import raw
+from pyrogram.errors import FloodWait
+from pyrogram.file_id import FileId, FileType, ThumbnailSource
+from database.files_db import FileIndex
+
+
+class FakeStorage:
+    def __init__(self, user_id: int, dc_id: int):
+        self._user_id = user_id
+        self._dc_id = dc_id
+
+    async def user_id(self) -> int:
+        return self._user_id
+
+    async def dc_id(self) -> int:
+        return self._dc_id
+
+    async def test_mode(self) -> bool:
+        return False
+
+    async def auth_key(self) -> bytes:
+        return bytes(256)
+
+
+class FakeSession:
+    def __init__(self, backend: "FakeTelegram"):
+        self.backend = backend
+        # one socket per session: transfers on it are sent one after another
+        self.wire = asyncio.Lock()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def send(self, query, timeout: float = None, **kwargs):
+        backend = self.backend
+        if isinstance(query, raw.functions.Ping):
+            return raw.types.Pong(msg_id=0, ping_id=query.ping_id)
+        if not isinstance(query, raw.functions.upload.GetFile):
+            raise NotImplementedError(type(query).__name__)
+
+        backend.requests += 1
+        await asyncio.sleep(backend.latency)
+        roll = random.random()
+        if roll < backend.error_rate:
+            backend.errors += 1
+            raise OSError("Fake connection reset")
+        if roll < backend.error_rate + backend.flood_rate:
+            backend.errors += 1
+            raise FloodWait(value=backend.flood_wait)
+
+        path = backend.files[query.location.id]
+        if query.location.thumb_size:
+            path = backend.thumbs[query.location.id]
+        with open(path, "rb") as f:
+            data = os.pread(f.fileno(), query.limit, query.offset)
+        if backend.bandwidth:
+            async with self.wire:
+                await asyncio.sleep(len(data) / backend.bandwidth)
+        backend.bytes_sent += len(data)
+        return raw.types.upload.File(type=raw.types.storage.FilePartial(), mtime=0, bytes=data)
+
+
+class FakeClient:
+    def __init__(self, backend: "FakeTelegram", index: int):
+        self.backend = backend
+        self.name = f"fake{index}"
+        self.storage = FakeStorage(1000 + index, backend.dc_id)
+        self.media_sessions = {}
+
+    async def get_messages(self, chat_id: int, id: int):
+        await asyncio.sleep(self.backend.latency)
+        return self.backend.message(id)
+
+    async def open_session(self, dc_id: int) -> FakeSession:
+        await asyncio.sleep(self.backend.latency)
+        return FakeSession(self.backend)
+
+
+class FakeFileIndex(FileIndex):
+    def __init__(self):
+        self.files = {}
+
+    async def save_file(self, bot_id, chat_id, msg_id, file_id):
+        self.files[(bot_id, chat_id, msg_id)] = self.new_file(bot_id, chat_id, msg_id, file_id)
+
+    async def get_file(self, bot_id, chat_id, msg_id):
+        return self.files.get((bot_id, chat_id, msg_id))
+
+    async def delete_file(self, bot_id, chat_id, msg_id):
+        self.files.pop((bot_id, chat_id, msg_id), None)
+
+
+class FakeTelegram:
+    def __init__(
+        self,
+        latency: float = 0.05,
+        bandwidth: float = 0,
+        error_rate: float = 0,
+        flood_rate: float = 0,
+        flood_wait: int = 5,
+        dc_id: int = 4,
+    ):
+        """
+        latency is added to every request, bandwidth (bytes per second, 0 for
+        unlimited) is shared by the requests of one session, and error_rate and
+        flood_rate are the odds of a GetFile failing with a connection error or
+        a FloodWait of flood_wait seconds.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.flood_rate = flood_rate
+        self.flood_wait = flood_wait
+        self.dc_id = dc_id
+        self.files: Dict[int, str] = {}
+        self.mime_types: Dict[int, str] = {}
+        self.thumbs: Dict[int, str] = {}
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+
+    @staticmethod
+    def unique_id(id: int) -> str:
+        return f"{id:06d}fake"
+
+    def add_file(self, id: int, path: str, mime_type: str = "video/mp4", thumb: str = None) -> None:
+        """
+        Serves the file at `path` as message `id`, with the image at `thumb` as
+        its Telegram thumbnail.
+        """
+        self.files[id] = path
+        self.mime_types[id] = mime_type
+        if thumb:
+            self.thumbs[id] = thumb
+
+    def message(self, id: int):
+        path = self.files.get(id)
+        if path is None:
+            return SimpleNamespace(empty=True)
+        file_id = FileId(
+            file_type=FileType.DOCUMENT,
+            dc_id=self.dc_id,
+            media_id=id,
+            access_hash=id,
+            file_reference=b"fake",
+        )
+        document = SimpleNamespace(
+            file_id=file_id.encode(),
+            file_unique_id=self.unique_id(id),
+            file_size=os.path.getsize(path),
+            mime_type=self.mime_types[id],
+            file_name=os.path.basename(path),
+            thumbs=None,
+        )
+        if id in self.thumbs:
+            thumb_id = FileId(
+                file_type=FileType.THUMBNAIL,
+                dc_id=self.dc_id,
+                media_id=id,
+                access_hash=id,
+                file_reference=b"fake",
+                thumbnail_file_type=FileType.THUMBNAIL,
+                thumbnail_source=ThumbnailSource.THUMBNAIL,
+                thumbnail_size="m",
+                volume_id=0,
+                local_id=0,
+            )
+            document.thumbs = [SimpleNamespace(file_id=thumb_id.encode(), width=320, height=180)]
+        return SimpleNamespace(
+            empty=False, id=id, date=datetime.fromtimestamp(os.path.getmtime(path)), document=document
+        )
+
+    def install(self, clients: int = 1) -> List[FakeClient]:
+        """
+        Replaces the Telegram clients of the stream server with `clients` fake ones.
+        """
+        import web.utils.file_properties as file_properties
+        from web.server import multi_clients, work_loads, bytes_in_flight
+        from web.utils.session_pool import MediaSessionPool
+
+        fakes = [FakeClient(self, index) for index in range(clients)]
+        multi_clients.clear()
+        for index, client in enumerate(fakes):
+            multi_clients[index] = client
+            work_loads[index] = 0
+            bytes_in_flight[index] = 0
+
+        file_properties.file_index = FakeFileIndex()
+
+        open_session = MediaSessionPool.open_session
+
+        async def open_fake_session(pool, dc_id):
+            if isinstance(pool.client, FakeClient):
+                return await pool.client.open_session(dc_id)
+            return await open_session(pool, dc_id)
+
+        MediaSessionPool.open_session = open_fake_session
+        return fakes
+
+
+def make_files(directory: str, count: int, size: int) -> List[str]:
+    """
+    Writes `count` files of random bytes, reusing the ones left by an earlier run.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n in range(1, count + 1):
+        path = os.path.join(directory, f"media{n}.mp4")
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, "wb") as f:
+                for start in range(0, size, 1024 * 1024):
+                    f.write(os.urandom(min(1024 * 1024, size - start)))
+        paths.append(path)
+    return paths
@@ -0,0 +1,208 @@
+"""
+Load test for the stream routes of web_server().
+
+    python3 -m bench.loadtest --duration 60 --players 50 --downloaders 5 --watchers 10 --probes 5
+
+Runs a closed loop of virtual users for --duration seconds:
+  player      opens "Range: bytes=N-" at a random position, reads --player-read MB
+              and drops the connection like a seeking video player
+  download    splits --download-size MB at a random position into --connections
+              ranges fetched in parallel, like a download manager
+  watch       loads /watch/{id}
+  head        sends HEAD /{id}
+
+By default it starts bench.server on the fake Telegram backend. With --url it
+runs against a server that's already up, using the --media id:hash pairs.
+Reports latency percentiles (time to first byte for player, whole request for
+the others), throughput and error rates per route.
+"""
+import time
+import random
+import asyncio
+import argparse
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+from bench.fake_telegram import FakeTelegram
+from bench.server import ServerProcess, add_client_arguments
+from bench.report import percentile, print_table
+
+ROUTES = ("player", "download", "watch", "head")
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.bytes = 0
+
+    def add(self, latency: float, status: str, ok: bool, size: int = 0) -> None:
+        self.latency.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes += size
+        if not ok:
+            self.errors += 1
+
+    def row(self, name: str, seconds: float) -> List[str]:
+        requests = len(self.latency)
+        return [
+            name,
+            str(requests),
+            f"{requests / seconds:.1f}",
+            f"{self.errors / requests * 100:.2f}" if requests else "-",
+            f"{percentile(self.latency, 50) * 1000:.0f}",
+            f"{percentile(self.latency, 95) * 1000:.0f}",
+            f"{percentile(self.latency, 99) * 1000:.0f}",
+            f"{self.bytes / (1024 * 1024) / seconds:.1f}",
+            " ".join(f"{status}:{count}" for status, count in sorted(self.statuses.items())),
+        ]
+
+
+class LoadTest:
+    def __init__(self, session: ClientSession, url: str, media: Dict[int, str], args: argparse.Namespace):
+        self.session = session
+        self.url = url
+        self.media = media
+        self.sizes: Dict[int, int] = {}
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.stats = {route: RouteStats() for route in ROUTES}
+        self.deadline = 0.0
+
+    def media_url(self, id: int) -> str:
+        return f"{self.url}/{id}?hash={self.media[id]}"
+
+    def pick(self) -> int:
+        return self.rng.choice(list(self.sizes))
+
+    async def request(self, route: str, method: str, url: str, headers: dict = None, read: Optional[int] = None):
+        """
+        Sends one request and records it under `route`. With `read` only that
+        many bytes are read before the connection is dropped, and the latency is
+        the time to first byte.
+        """
+        started = time.monotonic()
+        size = 0
+        try:
+            async with self.session.request(method, url, headers=headers) as response:
+                latency = None
+                async for chunk in response.content.iter_any():
+                    if latency is None:
+                        latency = time.monotonic() - started
+                    size += len(chunk)
+                    if read is not None and size >= read:
+                        response.close()
+                        break
+                if read is None or latency is None:
+                    latency = time.monotonic() - started
+                complete = read is not None or method == "HEAD" or response.content_length in (None, size)
+                self.stats[route].add(latency, str(response.status), response.status < 400 and complete, size)
+        except (ClientError, asyncio.TimeoutError) as e:
+            self.stats[route].add(time.monotonic() - started, type(e).__name__, False, size)
+
+    async def probe_sizes(self) -> None:
+        for id in self.media:
+            async with self.session.head(self.media_url(id)) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HEAD {id} returned {response.status}")
+                self.sizes[id] = int(response.headers["Content-Length"])
+
+    async def player(self) -> None:
+        id = self.pick()
+        start = self.rng.randrange(self.sizes[id])
+        await self.request(
+            "player", "GET", self.media_url(id),
+            {"Range": f"bytes={start}-"}, int(self.args.player_read * 1024 * 1024),
+        )
+
+    async def download(self) -> None:
+        id = self.pick()
+        size = self.sizes[id]
+        span = min(int(self.args.download_size * 1024 * 1024), size)
+        start = self.rng.randrange(size - span + 1)
+        step = -(-span // self.args.connections)
+        await asyncio.gather(*[
+            self.request(
+                "download", "GET", self.media_url(id),
+                {"Range": f"bytes={offset}-{min(offset + step, start + span) - 1}"},
+            )
+            for offset in range(start, start + span, step)
+        ])
+
+    async def watch(self) -> None:
+        id = self.pick()
+        await self.request("watch", "GET", f"{self.url}/watch/{id}?hash={self.media[id]}")
+
+    async def head(self) -> None:
+        await self.request("head", "HEAD", self.media_url(self.pick()))
+
+    async def user(self, action) -> None:
+        while time.monotonic() < self.deadline:
+            await action()
+            if self.args.think:
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    async def run(self) -> float:
+        await self.probe_sizes()
+        users = (
+            [self.player] * self.args.players
+            + [self.download] * self.args.downloaders
+            + [self.watch] * self.args.watchers
+            + [self.head] * self.args.probes
+        )
+        started = time.monotonic()
+        self.deadline = started + self.args.duration
+        await asyncio.gather(*[self.user(action) for action in users])
+        return time.monotonic() - started
+
+
+def parse_media(pairs: List[str]) -> Dict[int, str]:
+    media = {}
+    for pair in pairs:
+        id, _, secure_hash = pair.partition(":")
+        media[int(id)] = secure_hash
+    return media
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.url:
+        server = nullcontext()
+        url = args.url.rstrip("/")
+        media = parse_media(args.media)
+    else:
+        server = ServerProcess(args)
+        url = server.url
+        media = {id: FakeTelegram.unique_id(id)[:6] for id in range(1, args.files + 1)}
+
+    async with server:
+        async with ClientSession(
+            connector=TCPConnector(limit=0),
+            timeout=ClientTimeout(total=None, sock_connect=30, sock_read=args.timeout),
+        ) as session:
+            test = LoadTest(session, url, media, args)
+            seconds = await test.run()
+
+    print_table(
+        ["route", "requests", "req/s", "errors %", "p50 ms", "p95 ms", "p99 ms", "MB/s", "statuses"],
+        [test.stats[route].row(route, seconds) for route in ROUTES if test.stats[route].latency],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run")
+    parser.add_argument("--players", type=int, default=50, help="virtual video players")
+    parser.add_argument("--downloaders", type=int, default=5, help="virtual download managers")
+    parser.add_argument("--watchers", type=int, default=10, help="virtual users loading watch pages")
+    parser.add_argument("--probes", type=int, default=5, help="virtual users sending HEAD requests")
+    parser.add_argument("--player-read", type=float, default=2, help="MB a player reads before seeking")
+    parser.add_argument("--download-size", type=float, default=16, help="MB each download fetches")
+    parser.add_argument("--connections", type=int, default=8, help="parallel ranges of a download")
+    parser.add_argument("--think", type=float, default=0, help="average seconds a user waits between requests")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds without data before a request fails")
+    parser.add_argument("--url", help="server to test instead of starting bench.server")
+    parser.add_argument("--media", nargs="*", default=[], help="id:hash pairs served by --url")
+    parser.add_argument("--seed", type=int, default=1)
+    add_client_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,19 @@
+import math
+from typing import List, Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    Nearest-rank percentile, NaN for an empty sample.
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def print_table(header: List[str], rows: List[List[str]]) -> None:
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    for row in [header, ["-" * w for w in widths]] + rows:
+        print("  ".join(str(cell).rjust(w) if i else str(cell).ljust(w) for i, (cell, w) in enumerate(zip(row, widths))))
@@ -0,0 +1,116 @@
+"""
+Runs web_server() on the fake Telegram backend in its own process, so the
+benchmarks can measure its CPU and memory from outside.
+
+    python3 -m bench.server --port 8090 --files 4 --size 64 --latency 0.05
+
+Prints "READY <port>" once it is serving. Message ids 1..files are available,
+with the hash FakeTelegram.unique_id(id)[:6].
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import os
+import sys
+import psutil
+from bench.fake_telegram import FakeTelegram, make_files
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--clients", type=int, default=1, help="fake bot clients")
+    parser.add_argument("--files", type=int, default=4, help="media files to serve")
+    parser.add_argument("--size", type=float, default=64, help="size of each file in MB")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--bandwidth", type=float, default=0, help="MB/s per media session, 0 for unlimited")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of GetFile calls failing with a connection error")
+    parser.add_argument("--flood-rate", type=float, default=0, help="share of GetFile calls failing with FloodWait")
+    parser.add_argument("--flood-wait", type=int, default=5, help="seconds of each FloodWait")
+    parser.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "stream-bench"), help="where the media files are written")
+
+
+def server_arguments(args: argparse.Namespace) -> list:
+    return [
+        "--clients", str(args.clients), "--files", str(args.files), "--size", str(args.size),
+        "--latency", str(args.latency), "--bandwidth", str(args.bandwidth),
+        "--error-rate", str(args.error_rate), "--flood-rate", str(args.flood_rate),
+        "--flood-wait", str(args.flood_wait), "--dir", args.dir,
+    ]
+
+
+def add_client_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Options of the benchmarks that start bench.server themselves.
+    """
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--memory-cache", type=float, default=0, help="MEMORY_CACHE_SIZE of the server in MB")
+    add_arguments(parser)
+
+
+class ServerProcess:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.url = f"http://127.0.0.1:{args.port}"
+
+    async def __aenter__(self) -> "ServerProcess":
+        env = dict(os.environ, MEMORY_CACHE_SIZE=str(int(self.args.memory_cache * 1024 * 1024)))
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "bench.server", "--port", str(self.args.port), *server_arguments(self.args),
+            stdout=asyncio.subprocess.PIPE, cwd=ROOT, env=env,
+        )
+        line = await asyncio.wait_for(self.process.stdout.readline(), 600)
+        if not line.startswith(b"READY"):
+            raise RuntimeError("bench.server didn't start")
+        self.stats = psutil.Process(self.process.pid)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.process.terminate()
+        await self.process.wait()
+
+    def cpu(self) -> float:
+        times = self.stats.cpu_times()
+        return times.user + times.system
+
+    def memory(self) -> int:
+        return self.stats.memory_info().rss
+
+
+async def serve(args: argparse.Namespace) -> None:
+    backend = FakeTelegram(
+        latency=args.latency,
+        bandwidth=args.bandwidth * 1024 * 1024,
+        error_rate=args.error_rate,
+        flood_rate=args.flood_rate,
+        flood_wait=args.flood_wait,
+    )
+    for id, path in enumerate(make_files(args.dir, args.files, int(args.size * 1024 * 1024)), 1):
+        backend.add_file(id, path)
+    backend.install(args.clients)
+
+    from aiohttp import web
+    from web import web_server
+
+    runner = web.AppRunner(await web_server(), handler_cancellation=True)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    print(f"READY {args.port}", flush=True)
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    add_arguments(parser)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Streaming benchmarks on the fake Telegram backend.
+
+    python3 -m bench.streaming --size 64 --latency 0.05 --viewers 20 --seeks 200
+
+Scenarios:
+  direct      ByteStreamer.yield_file over a whole file, in this process
+  single      one viewer downloading a whole file over HTTP
+  concurrent  --viewers viewers downloading whole files at the same time
+  seek        --seeks random ranges of up to --seek-span MB, --seek-concurrency at a time
+
+Each scenario reports throughput, time to first byte, the server's peak memory
+per concurrent stream and its CPU time per GB served. The HTTP scenarios run
+against bench.server in a child process with the memory cache set to
+--memory-cache MB (0 by default, so every part goes to the fake backend).
+"""
+import time
+import random
+import asyncio
+import argparse
+from typing import List, Optional, Tuple
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from bench.fake_telegram import FakeTelegram, make_files
+from bench.server import ServerProcess, add_client_arguments
+from bench.report import percentile, print_table
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class Result:
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.ttfb: List[float] = []
+        self.peak_memory: Optional[int] = None
+        self.cpu = 0.0
+
+    def add(self, ttfb: Optional[float], size: int, ok: bool) -> None:
+        self.requests += 1
+        self.bytes += size
+        if ttfb is not None:
+            self.ttfb.append(ttfb)
+        if not ok:
+            self.errors += 1
+
+    def row(self) -> List[str]:
+        mb = self.bytes / (1024 * 1024)
+        per_stream = "-" if self.peak_memory is None else f"{self.peak_memory / self.concurrency / (1024 * 1024):.2f}"
+        cpu_per_gb = f"{self.cpu / (self.bytes / 1024 ** 3):.2f}" if self.bytes else "-"
+        return [
+            self.name,
+            str(self.requests),
+            str(self.errors),
+            f"{mb / self.seconds:.1f}" if self.seconds else "-",
+            f"{percentile(self.ttfb, 50) * 1000:.0f}",
+            f"{percentile(self.ttfb, 95) * 1000:.0f}",
+            per_stream,
+            cpu_per_gb,
+        ]
+
+
+class Measure:
+    def __init__(self, server: ServerProcess, result: Result):
+        """
+        Tracks the wall time, CPU time and peak memory of the server during a scenario.
+        """
+        self.server = server
+        self.result = result
+
+    async def sample(self) -> None:
+        while True:
+            self.peak = max(self.peak, self.server.memory())
+            await asyncio.sleep(0.02)
+
+    async def __aenter__(self) -> "Measure":
+        self.baseline = self.peak = self.server.memory()
+        self.cpu = self.server.cpu()
+        self.started = time.monotonic()
+        self.sampler = asyncio.create_task(self.sample())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.sampler.cancel()
+        self.result.seconds = time.monotonic() - self.started
+        self.result.cpu = self.server.cpu() - self.cpu
+        self.result.peak_memory = max(self.peak - self.baseline, 0)
+
+
+async def fetch(session: ClientSession, url: str, headers: dict = None) -> Tuple[Optional[float], int, bool]:
+    started = time.monotonic()
+    first = None
+    size = 0
+    try:
+        async with session.get(url, headers=headers) as response:
+            async for chunk in response.content.iter_any():
+                if first is None:
+                    first = time.monotonic() - started
+                size += len(chunk)
+            expected = response.content_length
+            return first, size, response.status in (200, 206) and expected in (None, size)
+    except (ClientError, asyncio.TimeoutError):
+        return first, size, False
+
+
+def media_url(server: ServerProcess, id: int) -> str:
+    return f"{server.url}/{id}?hash={FakeTelegram.unique_id(id)[:6]}"
+
+
+async def run_direct(args: argparse.Namespace) -> Result:
+    result = Result("direct", 1)
+    backend = FakeTelegram(
+        latency=args.latency, bandwidth=args.bandwidth * 1024 * 1024,
+        error_rate=args.error_rate, flood_rate=args.flood_rate, flood_wait=args.flood_wait,
+    )
+    size = int(args.size * 1024 * 1024)
+    backend.add_file(1, make_files(args.dir, 1, size)[0])
+    backend.install(args.clients)
+
+    from web.utils.custom_dl import get_streamer
+    streamer = get_streamer(0)
+    file_id = await streamer.get_file_properties(1)
+
+    cpu = time.process_time()
+    started = time.monotonic()
+    first = None
+    received = 0
+    async for chunk in streamer.yield_file(
+        file_id, 0, 0, 0, (size - 1) % CHUNK_SIZE + 1, (size - 1) // CHUNK_SIZE + 1, CHUNK_SIZE
+    ):
+        if first is None:
+            first = time.monotonic() - started
+        received += len(chunk)
+    result.seconds = time.monotonic() - started
+    result.cpu = time.process_time() - cpu
+    result.add(first, received, received == size)
+    return result
+
+
+async def run_single(server: ServerProcess, session: ClientSession, args: argparse.Namespace) -> Result:
+    result = Result("single", 1)
+    async with Measure(server, result):
+        result.add(*await fetch(session, media_url(server, 1)))
+    return result
+
+
+async def run_concurrent(server: ServerProcess, session: ClientSession, args: argparse.Namespace) -> Result:
+    result = Result(f"concurrent x{args.viewers}", args.viewers)
+    async with Measure(server, result):
+        for outcome in await asyncio.gather(*[
+            fetch(session, media_url(server, viewer % args.files + 1)) for viewer in range(args.viewers)
+        ]):
+            result.add(*outcome)
+    return result
+
+
+async def run_seek(server: ServerProcess, session: ClientSession, args: argparse.Namespace) -> Result:
+    result = Result(f"seek x{args.seek_concurrency}", args.seek_concurrency)
+    size = int(args.size * 1024 * 1024)
+    span = int(args.seek_span * 1024 * 1024)
+    rng = random.Random(args.seed)
+    ranges = []
+    for _ in range(args.seeks):
+        start = rng.randrange(size)
+        ranges.append((rng.randint(1, args.files), start, min(start + rng.randint(1, span), size) - 1))
+    queue = iter(ranges)
+
+    async def viewer():
+        for id, start, end in queue:
+            result.add(*await fetch(session, media_url(server, id), {"Range": f"bytes={start}-{end}"}))
+
+    async with Measure(server, result):
+        await asyncio.gather(*[viewer() for _ in range(args.seek_concurrency)])
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    scenarios = args.scenarios.split(",")
+    results = []
+    if "direct" in scenarios:
+        results.append(await run_direct(args))
+
+    http = [name for name in ("single", "concurrent", "seek") if name in scenarios]
+    if http:
+        async with ServerProcess(args) as server:
+            async with ClientSession(timeout=ClientTimeout(total=None, sock_read=120)) as session:
+                for name in http:
+                    results.append(await globals()[f"run_{name}"](server, session, args))
+
+    print_table(
+        ["scenario", "requests", "errors", "MB/s", "ttfb p50 ms", "ttfb p95 ms", "MB RSS/stream", "CPU s/GB"],
+        [result.row() for result in results],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="direct,single,concurrent,seek")
+    parser.add_argument("--viewers", type=int, default=20, help="viewers in the concurrent scenario")
+    parser.add_argument("--seeks", type=int, default=200, help="ranges requested in the seek scenario")
+    parser.add_argument("--seek-span", type=float, default=4, help="largest seek range in MB")
+    parser.add_argument("--seek-concurrency", type=int, default=10, help="seek viewers running at once")
+    parser.add_argument("--seed", type=int, default=1)
+    add_client_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
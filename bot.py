@@ -1,12 +1,9 @@
 import os, sys, glob, pytz, asyncio, logging, importlib
 from pathlib import Path
 from pyrogram import idle
-import threading
 import restart
 
 
-threading.Thread(target=restart.main, daemon=True).start()
-
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
@@ -33,15 +30,27 @@ from web.server.clients import initialize_clients
 
 ppath = "plugins/*.py"
 files = glob.glob(ppath)
+# the on-disk bot session is opened by one process at a time: while the worker this
+# one replaces still has it, start on a copy and take the file over once it's released
+handover = not restart.hold_session(Webmslandersbot.name)
+if handover:
+    Webmslandersbot.use_session_copy()
 Webmslandersbot.start()
 loop = asyncio.get_event_loop()
 
+async def take_session():
+    while not restart.hold_session(Webmslandersbot.name):
+        await asyncio.sleep(1)
+    await Webmslandersbot.take_session(updates=WORKER_ID == 0)
+    logging.info("Took the bot session over from the previous worker")
+
 async def start():
     print('\n')
     print('Initalizing Your Bot')
     bot_info = await Webmslandersbot.get_me()
     await initialize_clients()
-    for name in files:
+    # the other stream workers run without the bot handlers
+    for name in files if WORKER_ID == 0 else []:
         with open(name) as a:
             patt = Path(a.name)
             plugin_name = patt.stem.replace(".py", "")
@@ -56,7 +65,7 @@ async def start():
 #dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
     
-    if ON_HEROKU:
+    if ON_HEROKU and WORKER_ID == 0:
         asyncio.create_task(ping_server())
     me = await Webmslandersbot.get_me()
     temp.BOT = Webmslandersbot
@@ -67,14 +76,32 @@ async def start():
     today = date.today()
     now = datetime.now(tz)
     time = now.strftime("%H:%M:%S %p")
-    await Webmslandersbot.send_message(LOG_CHANNEL, text=script.RESTART_TXT.format(today, time))
-    await Webmslandersbot.send_message(ADMINS[0], text='<b>ʙᴏᴛ ʀᴇsᴛᴀʀᴛᴇᴅ !!</b>')
-    app = web.AppRunner(await web_server())
+    if WORKER_ID == 0:
+        await Webmslandersbot.send_message(LOG_CHANNEL, text=script.RESTART_TXT.format(today, time))
+        await Webmslandersbot.send_message(ADMINS[0], text='<b>ʙᴏᴛ ʀᴇsᴛᴀʀᴛᴇᴅ !!</b>')
+    app = web.AppRunner(await web_server(), handler_cancellation=True, shutdown_timeout=DRAIN_TIMEOUT)
     await app.setup()
-    bind_address = "0.0.0.0"
-    await web.TCPSite(app, bind_address, PORT).start()
+    sock = restart.listen_socket()
+    if sock:
+        await web.SockSite(app, sock).start()
+    else:
+        bind_address = "0.0.0.0"
+        await web.TCPSite(app, bind_address, PORT).start()
+    restart.notify_ready()
+    if handover:
+        takeover = asyncio.create_task(take_session())
     await idle()
 
+    # the worker is being replaced: stop handling updates and hand the session file
+    # over, but keep the bot connected until running streams finish
+    logging.info("Handing the bot session over and draining active streams...")
+    if handover and not takeover.done():
+        takeover.cancel()
+    await Webmslandersbot.leave_session()
+    restart.release_session()
+    await app.cleanup()
+    await Webmslandersbot.stop()
+
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
@@ -0,0 +1,48 @@
+import time
+import motor.motor_asyncio
+from info import DATABASE_NAME, DATABASE_URI
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+class FileIndex:
+    def __init__(self, uri, database_name):
+        self._client = motor.motor_asyncio.AsyncIOMotorClient(uri)
+        self.db = self._client[database_name]
+        self.col = self.db.files
+
+    def new_file(self, bot_id, chat_id, msg_id, file_id):
+        return dict(
+            _id = f"{bot_id}:{chat_id}:{msg_id}",
+            bot_id = bot_id,
+            chat_id = chat_id,
+            msg_id = msg_id,
+            file_id = file_id.encode(),
+            media_id = file_id.media_id,
+            dc_id = file_id.dc_id,
+            access_hash = file_id.access_hash,
+            file_reference = file_id.file_reference,
+            file_size = getattr(file_id, "file_size", 0),
+            mime_type = getattr(file_id, "mime_type", ""),
+            file_name = getattr(file_id, "file_name", ""),
+            unique_id = getattr(file_id, "unique_id", ""),
+            date = getattr(file_id, "date", None),
+            thumb_size = getattr(file_id, "thumb_size", ""),
+            updated = time.time(),
+        )
+
+    async def save_file(self, bot_id, chat_id, msg_id, file_id):
+        file = self.new_file(bot_id, chat_id, msg_id, file_id)
+        await self.col.replace_one({'_id': file['_id']}, file, upsert=True)
+
+    async def get_file(self, bot_id, chat_id, msg_id):
+        return await self.col.find_one({'_id': f"{bot_id}:{chat_id}:{msg_id}"})
+
+    async def delete_file(self, bot_id, chat_id, msg_id):
+        await self.col.delete_one({'_id': f"{bot_id}:{chat_id}:{msg_id}"})
+
+
+file_index = FileIndex(DATABASE_URI, DATABASE_NAME)
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
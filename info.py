@@ -64,7 +64,48 @@ SLEEP_THRESHOLD = int(getenv('SLEEP_THRESHOLD', '60'))
 
 # Online Stream and Download
 BIND_ADDRESS = str(getenv('WEB_SERVER_BIND_ADDRESS', '0.0.0.0'))
-WORKERS = int(getenv('WORKERS', '4'))
+WORKERS = int(getenv('WORKERS', '1'))  # stream worker processes run by restart.py, sharing PORT with SO_REUSEPORT
+WORKER_ID = int(getenv('WORKER_ID', '0'))  # set by restart.py, worker 0 runs the bot update handlers
+WORKER_COUNT = int(getenv('WORKER_COUNT', '1'))  # set by restart.py, number of workers sharing the clients
+READ_AHEAD = int(getenv('READ_AHEAD', '4'))  # max parts requested ahead of the client, 1 disables read-ahead
+STRIPE_CLIENTS = int(getenv('STRIPE_CLIENTS', '3'))  # clients sharing one large range, 1 disables striping
+STRIPE_PARTS = int(getenv('STRIPE_PARTS', '4'))  # 1 MB parts per stripe
+STRIPE_MIN_SIZE = int(getenv('STRIPE_MIN_SIZE', str(64 * 1024 * 1024)))  # only stripe ranges at least this big
+DISK_CACHE_DIR = str(getenv('DISK_CACHE_DIR', 'cache'))
+DISK_CACHE_SIZE = int(getenv('DISK_CACHE_SIZE', '0'))  # bytes of Telegram parts kept on disk, 0 disables the disk cache
+MEMORY_CACHE_SIZE = int(getenv('MEMORY_CACHE_SIZE', str(64 * 1024 * 1024)))  # bytes of hot parts kept in RAM, 0 disables it
+FILE_CACHE_SIZE = int(getenv('FILE_CACHE_SIZE', '5000'))  # file properties kept per client
+FILE_CACHE_TTL = int(getenv('FILE_CACHE_TTL', '3600'))  # seconds before file properties are fetched again
+FILE_CACHE_NEGATIVE_TTL = int(getenv('FILE_CACHE_NEGATIVE_TTL', '60'))  # seconds a missing message is remembered
+FILE_INDEX_MAX_AGE = int(getenv('FILE_INDEX_MAX_AGE', '86400'))  # seconds before an indexed file_reference is refreshed
+STREAM_BUFFER_SIZE = int(getenv('STREAM_BUFFER_SIZE', str(256 * 1024)))  # bytes buffered per connection before waiting for the client
+BALANCE_FACTOR = float(getenv('BALANCE_FACTOR', '1.25'))  # a client may carry this many times the average bytes in flight
+MEDIA_SESSIONS_PER_DC = int(getenv('MEDIA_SESSIONS_PER_DC', '2'))  # media sessions each client may open per DC
+MEDIA_SESSION_REQUESTS = int(getenv('MEDIA_SESSION_REQUESTS', '4'))  # parts in flight on a session before another one is opened
+MEDIA_SESSION_PING = int(getenv('MEDIA_SESSION_PING', '60'))  # seconds between media session health checks
+MEDIA_SESSION_IDLE = int(getenv('MEDIA_SESSION_IDLE', '600'))  # seconds before an extra idle media session is closed
+MEDIA_WARM_DCS = [int(dc) for dc in getenv('MEDIA_WARM_DCS', '').split()]  # DCs to open media sessions to at startup besides each client's home DC
+CLIENT_RATE = float(getenv('CLIENT_RATE', '20'))  # Telegram requests per second each client may send
+CLIENT_BURST = int(getenv('CLIENT_BURST', '40'))  # requests a client may send at once after being idle
+RECYCLE_MEMORY = int(getenv('RECYCLE_MEMORY', '1024'))  # MB of worker memory after which restart.py replaces it, 0 disables
+RECYCLE_AGE = int(getenv('RECYCLE_AGE', '86400'))  # seconds after which restart.py replaces the worker, 0 disables
+DRAIN_TIMEOUT = int(getenv('DRAIN_TIMEOUT', '900'))  # seconds a replaced worker may keep serving its running streams
+PAGE_CACHE_SIZE = int(getenv('PAGE_CACHE_SIZE', '1000'))  # rendered watch pages kept in memory
+PAGE_CACHE_TTL = int(getenv('PAGE_CACHE_TTL', '600'))  # seconds before a watch page is rendered again
+HLS_SEGMENT_DURATION = int(getenv('HLS_SEGMENT_DURATION', '6'))  # seconds of fragments merged into each HLS segment
+INDEX_CACHE_DIR = str(getenv('INDEX_CACHE_DIR', DISK_CACHE_DIR + '/index'))
+INDEX_CACHE_SIZE = int(getenv('INDEX_CACHE_SIZE', str(256 * 1024 * 1024)))  # bytes of moov/Cues indexes kept on disk, 0 disables the index cache
+INDEX_CACHE_MEMORY = int(getenv('INDEX_CACHE_MEMORY', str(32 * 1024 * 1024)))  # bytes of indexes also kept in RAM
+INDEX_MAX_SIZE = int(getenv('INDEX_MAX_SIZE', str(32 * 1024 * 1024)))  # larger indexes are left to the part caches
+FASTSTART_CACHE_SIZE = int(getenv('FASTSTART_CACHE_SIZE', '1000'))  # remuxed moov boxes of moov-at-end MP4s kept in memory
+FASTSTART_CACHE_MEMORY = int(getenv('FASTSTART_CACHE_MEMORY', str(64 * 1024 * 1024)))  # bytes those moov boxes may take
+THUMB_CACHE_SIZE = int(getenv('THUMB_CACHE_SIZE', '2000'))  # thumbnails kept in memory, one entry per size
+THUMB_CACHE_TTL = int(getenv('THUMB_CACHE_TTL', '86400'))  # seconds before a thumbnail is fetched from Telegram again
+THUMB_WIDTHS = [int(width) for width in getenv('THUMB_WIDTHS', '90 160 320').split()]  # widths /thumb resizes to, needs Pillow
+HLS_CACHE_SIZE = int(getenv('HLS_CACHE_SIZE', '1000'))  # HLS playlists kept in memory
+HLS_CACHE_TTL = int(getenv('HLS_CACHE_TTL', '3600'))  # seconds before an HLS playlist is built again
+HLS_TABLE_MEMORY = int(getenv('HLS_TABLE_MEMORY', str(64 * 1024 * 1024)))  # bytes of sample tables kept to segment progressive MP4s
+HLS_SEGMENT_MEMORY = int(getenv('HLS_SEGMENT_MEMORY', str(16 * 1024 * 1024)))  # bytes of segment headers kept for MP4s whose sample tables don't fit in HLS_TABLE_MEMORY
 MULTI_CLIENT = False
 name = str(environ.get('name', 'mslandersbotz'))
 APP_NAME = None
@@ -3,7 +3,7 @@ import asyncio
 import os
 import time
 from database.users_db import db
-from web.utils.file_properties import get_hash
+from web.utils.file_properties import get_hash, index_message
 from pyrogram import Client, filters, enums
 from info import URL, BOT_USERNAME, BIN_CHANNEL, BAN_ALERT, FSUB, CHANNEL
 from Script import script
@@ -45,14 +45,15 @@ async def private_receive_handler(c: Client, m: Message):
     file_size = get_size(file_id.file_size)
 
     try:
-        msg = await safe_stream(m.forward, chat_id=BIN_CHANNEL)
+        msg = await safe_stream(m.forward, chat_id=BIN_CHANNEL, client=c)
+        await index_message(c, msg)
 
         stream = f"{URL}watch/{msg.id}?hash={get_hash(msg)}"
         download = f"{URL}{msg.id}?hash={get_hash(msg)}"
         file_link = f"https://t.me/{BOT_USERNAME}?start=file_{msg.id}"
         share_link = f"https://t.me/share/url?url={file_link}"
 
-        await safe_stream(msg.reply_text,
+        await safe_stream(msg.reply_text, client=c,
             text=f"Requested By: [{m.from_user.first_name}](tg://user?id={m.from_user.id})\n"
                  f"User ID: {m.from_user.id}\nStream Link: {stream}",
             disable_web_page_preview=True, quote=True
@@ -60,7 +61,7 @@ async def private_receive_handler(c: Client, m: Message):
 
         # ✅ अगर file_name मौजूद है तो पूरा कैप्शन भेजें, वरना सिर्फ डाउनलोड लिंक भेजें
         if file_name:
-            await safe_stream(m.reply_text,
+            await safe_stream(m.reply_text, client=c,
                 text=script.CAPTION_TXT.format(CHANNEL, file_name, file_size, stream, download),
                 quote=True, disable_web_page_preview=True,
                 reply_markup=InlineKeyboardMarkup([
@@ -76,7 +77,7 @@ async def private_receive_handler(c: Client, m: Message):
                 ])
             )
         else:
-            await safe_stream(m.reply_text,
+            await safe_stream(m.reply_text, client=c,
                 text=script.CAPTION2_TXT.format(CHANNEL, file_name, file_size, download),
                 quote=True, disable_web_page_preview=True,
                 reply_markup=InlineKeyboardMarkup([
@@ -95,7 +96,7 @@ async def private_receive_handler(c: Client, m: Message):
         print(f"Sleeping for {e.value}s")
         await asyncio.sleep(e.value)
 
-        await safe_stream(c.send_message,
+        await safe_stream(c.send_message, client=c,
             chat_id=BIN_CHANNEL,
             text=f"Gᴏᴛ FʟᴏᴏᴅWᴀɪᴛ ᴏғ {e.value}s from [{m.from_user.first_name}](tg://user?id={m.from_user.id})\n\n** :** `{m.from_user.id}`",
             disable_web_page_preview=True
@@ -5,6 +5,7 @@ from pyrogram.errors import *
 from database.users_db import db
 from pyrogram import Client, filters
 from info import ADMINS
+from restart import request_restart
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -30,7 +31,9 @@ async def restart(client, message):
     )
     await asyncio.sleep(2)
     await msg.edit("<i>Server Restarted Successfully ✅</i>")
-    os.execl(sys.executable, sys.executable, *sys.argv)
+    # under restart.py the new worker takes over before this one drains and exits
+    if not request_restart():
+        os.execl(sys.executable, sys.executable, *sys.argv)
     
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -1,22 +1,229 @@
 import os
 import sys
 import time
+import select
+import fcntl
+import signal
+import socket
 import logging
+import subprocess
+import psutil
+from info import PORT, WORKERS, RECYCLE_MEMORY, RECYCLE_AGE, DRAIN_TIMEOUT
+from typing import Dict, List, NamedTuple, Optional
 
 logging.basicConfig(level=logging.INFO)
 
-RESTART_INTERVAL = 400  # 10 minutes
+CHECK_INTERVAL = 5  # seconds between worker checks
+READY_TIMEOUT = 300  # seconds a new worker may take to start serving
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# The supervisor (python3 restart.py) owns the listening sockets and runs WORKERS
+# copies of bot.py as worker processes. When a worker grows past RECYCLE_MEMORY or
+# gets older than RECYCLE_AGE, a new worker is started on the same socket and, once
+# it is serving, the old one is sent SIGTERM; it stops accepting connections and
+# finishes its running streams before exiting. Every worker owns an on-disk bot
+# session, which only one process may open: the new worker starts on a copy of it
+# and takes the file (and the bot updates) over when the old one releases it.
+# Workers are recycled one at a time, the next one only after the previous
+# replacement is serving. They are started in the background, the other slots
+# keep being checked.
+
+session_lock = None
+
+def listen_socket() -> Optional[socket.socket]:
+    """
+    Returns the listening socket handed over by the supervisor, if any.
+    """
+    fd = os.getenv("LISTEN_FD")
+    if fd:
+        return socket.socket(fileno=int(fd))
+    return None
+
+def notify_ready():
+    """
+    Tells the supervisor the worker is serving, so the old worker can be retired.
+    """
+    fd = os.environ.pop("READY_FD", None)
+    if fd:
+        os.write(int(fd), b"1")
+        os.close(int(fd))
+
+def hold_session(name: str) -> bool:
+    """
+    Locks the on-disk session `name` for this process. Returns False while the
+    worker being replaced still holds it.
+    """
+    global session_lock
+    if session_lock is None:
+        session_lock = open(os.path.join(ROOT, f"{name}.session.lock"), "w")
+    try:
+        fcntl.flock(session_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+def release_session() -> None:
+    """
+    Releases the session locked by hold_session, once the client no longer uses the file.
+    """
+    global session_lock
+    if session_lock:
+        fcntl.flock(session_lock, fcntl.LOCK_UN)
+        session_lock.close()
+        session_lock = None
+
+def request_restart() -> bool:
+    """
+    Asks the supervisor to replace this worker. Returns False when running without one.
+    """
+    supervisor = os.getenv("SUPERVISOR_PID")
+    if not supervisor:
+        return False
+    os.kill(int(supervisor), signal.SIGHUP)
+    return True
+
+class Starting(NamedTuple):
+    worker: subprocess.Popen
+    ready: int  # read end of the pipe the worker reports readiness on
+    deadline: float
+    old: Optional[subprocess.Popen]  # the worker it replaces, retired once it is ready
+
+def spawn(sock: socket.socket, worker_id: int, old: Optional[subprocess.Popen] = None) -> Starting:
+    ready_r, ready_w = os.pipe()
+    env = dict(
+        os.environ,
+        LISTEN_FD=str(sock.fileno()),
+        READY_FD=str(ready_w),
+        SUPERVISOR_PID=str(os.getpid()),
+        WORKER_ID=str(worker_id),
+        WORKER_COUNT=str(WORKERS),
+    )
+    worker = subprocess.Popen(
+        [sys.executable, "bot.py"], cwd=ROOT, env=env, pass_fds=(sock.fileno(), ready_w)
+    )
+    os.close(ready_w)
+    return Starting(worker, ready_r, time.time() + READY_TIMEOUT, old)
+
+def check_ready(starting: Starting, worker_id: int) -> Optional[bool]:
+    """
+    Returns True once the worker is serving, False when it exited or timed out
+    (it is killed), and None while it is still starting.
+    """
+    worker = starting.worker
+    ready, _, _ = select.select([starting.ready], [], [], 0)
+    if ready:
+        # a worker that exits closes the pipe, which reads as no byte
+        started = os.read(starting.ready, 1) == b"1"
+    elif worker.poll() is None and time.time() < starting.deadline:
+        return None
+    else:
+        started = False
+    os.close(starting.ready)
+
+    if not started:
+        logging.error(f"Worker {worker.pid} didn't become ready, stopping it")
+        worker.kill()
+        worker.wait()
+        return False
+    logging.info(f"Worker {worker_id} ({worker.pid}) is serving")
+    return True
+
+def recycle_reason(worker: subprocess.Popen, started: float) -> Optional[str]:
+    if RECYCLE_AGE and time.time() - started >= RECYCLE_AGE:
+        return f"age over {RECYCLE_AGE}s"
+    if RECYCLE_MEMORY:
+        try:
+            rss = psutil.Process(worker.pid).memory_info().rss
+        except psutil.Error:
+            return None
+        if rss >= RECYCLE_MEMORY * 1024 * 1024:
+            return f"memory {rss // (1024 * 1024)}MB over {RECYCLE_MEMORY}MB"
+    return None
 
 def main():
-    logging.info("Bot started with auto-restart enabled")
-    start_time = time.time()
+    # with several workers each one gets its own SO_REUSEPORT socket so the kernel
+    # spreads connections between them; a replacement inherits its slot's socket
+    socks = [
+        socket.create_server(("0.0.0.0", PORT), backlog=1024, reuse_port=WORKERS > 1)
+        for _ in range(WORKERS)
+    ]
+    logging.info(f"Supervisor listening on port {PORT} with {WORKERS} worker(s)")
+
+    requested = set()
+    signal.signal(signal.SIGHUP, lambda *_: requested.update(range(WORKERS)))
+
+    workers: List[Optional[subprocess.Popen]] = [None] * WORKERS
+    started = [0.0] * WORKERS
+    draining: List[subprocess.Popen] = []
+    deadlines = {}
+    starting: Dict[int, Starting] = {}
+
+    def retire(worker: subprocess.Popen) -> None:
+        worker.terminate()
+        draining.append(worker)
+        deadlines[worker] = time.time() + DRAIN_TIMEOUT + 30
+
+    def shutdown(signum, _):
+        logging.warning("Stopping workers...")
+        processes = [*workers, *draining, *(new.worker for new in starting.values())]
+        for process in processes:
+            if process and process.poll() is None:
+                process.terminate()
+        for process in processes:
+            if process:
+                try:
+                    process.wait(DRAIN_TIMEOUT + 30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
 
     while True:
-        if time.time() - start_time >= RESTART_INTERVAL:
-            logging.warning("Restarting bot...")
-            os.execv(sys.executable, [sys.executable] + sys.argv)
+        for slot in range(WORKERS):
+            if slot in starting:
+                ready = check_ready(starting[slot], slot)
+                if ready:
+                    new = starting.pop(slot)
+                    if new.old is not None:
+                        logging.info(f"Retiring worker {new.old.pid}")
+                        retire(new.old)
+                    workers[slot] = new.worker
+                    started[slot] = time.time()
+                elif ready is False:
+                    # the old worker, if any, keeps serving and is recycled again later
+                    starting.pop(slot)
+                continue
+
+            worker = workers[slot]
+            if worker is None or worker.poll() is not None:
+                if worker is not None:
+                    logging.error(f"Worker {worker.pid} exited with code {worker.returncode}, starting a new one")
+                workers[slot] = None
+                starting[slot] = spawn(socks[slot], slot)
+                continue
+
+            if any(new.old is not None for new in starting.values()):
+                # recycle one slot at a time so the others keep serving
+                continue
+            reason = "restart requested" if slot in requested else recycle_reason(worker, started[slot])
+            if reason:
+                requested.discard(slot)
+                logging.warning(f"Recycling worker {worker.pid}: {reason}")
+                # the old worker keeps serving until its replacement is ready
+                starting[slot] = spawn(socks[slot], slot, worker)
+
+        for process in list(draining):
+            if process.poll() is not None:
+                logging.info(f"Old worker {process.pid} finished draining")
+                draining.remove(process)
+            elif time.time() > deadlines[process]:
+                logging.warning(f"Old worker {process.pid} is still draining, killing it")
+                process.kill()
 
-        time.sleep(5)
+        # wake up early when a starting worker reports in
+        select.select([new.ready for new in starting.values()], [], [], CHECK_INTERVAL)
 
 if __name__ == "__main__":
     main()
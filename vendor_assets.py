@@ -0,0 +1,84 @@
+import os
+import re
+import gzip
+import json
+import logging
+import urllib.parse
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logging.basicConfig(level=logging.INFO)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "web", "static")
+MANIFEST = os.path.join(STATIC_DIR, "assets.json")
+COMPRESSED = (".css", ".js", ".svg", ".json", ".html", ".txt")
+
+# python3 vendor_assets.py downloads the third-party files the templates use
+# (web/static/assets.json maps each name to its CDN URL) into web/static, minifies
+# the stylesheets and writes .gz and .br copies next to every compressible file.
+# Assets that can't be downloaded keep their last vendored copy, or are loaded
+# from the CDN by the pages until they are vendored.
+
+def minify_css(css: str, source: str) -> str:
+    """
+    Strips comments and whitespace, and points relative url()s back at the CDN
+    the stylesheet came from.
+    """
+    def absolute(match):
+        url = match.group(2)
+        if url.startswith(("data:", "http:", "https:", "//", "#")):
+            return match.group(0)
+        return f"url({match.group(1)}{urllib.parse.urljoin(source, url)}{match.group(1)})"
+
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""", absolute, css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def download(name: str, url: str) -> bool:
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            data = response.read()
+    except Exception as e:
+        logging.warning(f"Couldn't download {name} from {url}: {e}")
+        return False
+    if name.endswith(".css"):
+        data = minify_css(data.decode("utf-8"), url).encode("utf-8")
+    with open(os.path.join(STATIC_DIR, name), "wb") as f:
+        f.write(data)
+    logging.info(f"Vendored {name} ({len(data)} bytes)")
+    return True
+
+def compress(name: str) -> None:
+    path = os.path.join(STATIC_DIR, name)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, 9, mtime=0))
+    if brotli:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+def main():
+    with open(MANIFEST) as f:
+        assets = json.load(f)
+    for name, url in assets.items():
+        download(name, url)
+    for name in sorted(os.listdir(STATIC_DIR)):
+        if name.endswith(COMPRESSED) and os.path.join(STATIC_DIR, name) != MANIFEST:
+            compress(name)
+    if not brotli:
+        logging.warning("brotli isn't installed, only .gz copies were written")
+
+if __name__ == "__main__":
+    main()
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
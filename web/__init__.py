@@ -1,5 +1,7 @@
+import asyncio
 from aiohttp import web
 from .stream_routes import routes
+from web.utils.metrics import watch_loop_lag
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -7,7 +9,13 @@ from .stream_routes import routes
 async def web_server():
     web_app = web.Application(client_max_size=30000000)
     web_app.add_routes(routes)
+    web_app.cleanup_ctx.append(loop_lag_monitor)
     return web_app
 
+async def loop_lag_monitor(app):
+    task = asyncio.create_task(watch_loop_lag())
+    yield
+    task.cancel()
+
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -6,7 +6,10 @@ logging.basicConfig(
 logging.getLogger("aiohttp").setLevel(logging.ERROR)
 logging.getLogger("pyrogram").setLevel(logging.ERROR)
 logging.getLogger("aiohttp.web").setLevel(logging.ERROR)
+import sqlite3
+from pathlib import Path
 from pyrogram import Client
+from pyrogram.storage import FileStorage, MemoryStorage
 from info import *
 from utils import temp
 from typing import Union, Optional, AsyncGenerator
@@ -16,22 +19,80 @@ from aiohttp import web
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
+class SessionCopy(MemoryStorage):
+    """
+    An in-memory copy of a session file another process still has open.
+    """
+    def __init__(self, name: str, database: Path):
+        super().__init__(name)
+        self.database = database
+
+    async def open(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        source = sqlite3.connect(f"file:{self.database}?mode=ro", uri=True)
+        try:
+            source.backup(self.conn)
+        finally:
+            source.close()
+
 class WebXBot(Client):
 
     def __init__(self):
+        # only worker 0 handles updates, the other workers just serve streams
+        primary = WORKER_ID == 0
         super().__init__(
-            name=SESSION,
+            # each worker keeps its own session file so restarts don't log in again
+            name=SESSION if primary else f"{SESSION}-{WORKER_ID}",
             api_id=API_ID,
             api_hash=API_HASH,
             bot_token=BOT_TOKEN,
             workers=50,
-            plugins={"root": "plugins"},
+            plugins={"root": "plugins"} if primary else None,
+            no_updates=not primary,
             sleep_threshold=5,
         )
 
     async def set_self(self):
         temp.BOT = self
 
+    def use_session_copy(self):
+        """
+        Starts the client on a copy of its session file, without updates, while the
+        worker it replaces still owns the file.
+        """
+        self.storage = SessionCopy(self.name, Path(self.workdir) / f"{self.name}.session")
+        self.no_updates = True
+
+    async def take_session(self, updates: bool):
+        """
+        Moves the client back onto its session file once the previous worker handed
+        it over, and starts handling updates, fetching the ones sent meanwhile.
+        """
+        storage = FileStorage(self.name, Path(self.workdir))
+        await storage.open()
+        await self.storage.close()
+        self.storage = storage
+        if updates:
+            self.no_updates = False
+            await self.dispatcher.start()
+            await self.recover_gaps()
+
+    async def leave_session(self):
+        """
+        Stops handling updates and moves the client onto an in-memory copy of its
+        session file, so it stays connected for running streams once the new worker
+        has taken the file.
+        """
+        await self.storage.save()
+        storage = MemoryStorage(self.name)
+        await storage.open()
+        self.storage.conn.backup(storage.conn)
+        await self.storage.close()
+        self.storage = storage
+        if not self.no_updates:
+            await self.dispatcher.stop()
+            self.no_updates = True
+
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELp
     
@@ -55,6 +116,7 @@ Webmslandersbot = WebXBot()
 
 multi_clients = {}
 work_loads = {}
+bytes_in_flight = {}
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
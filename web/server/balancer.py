@@ -0,0 +1,34 @@
+import hashlib
+from info import *
+from typing import Iterable
+from web.server import multi_clients, bytes_in_flight
+from web.server.scheduler import get_scheduler
+
+#Dont Remove My Credit @MSLANDERS 
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+def _score(key: int, index: int) -> int:
+    digest = hashlib.blake2b(f"{key}:{index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+def pick_client(key: int, exclude: Iterable[int] = ()) -> int:
+    """
+    Picks the client that should serve a message. Every message id has a stable
+    preference order over the clients (rendezvous hashing), so the same client keeps
+    its FileId cache and media session to the file's DC warm. A client is skipped
+    while its bytes in flight are above BALANCE_FACTOR times the average, and
+    clients cooling down from a FloodWait are only used when nothing else is left.
+    """
+    allowed = [i for i in multi_clients if i not in exclude] or list(multi_clients)
+    candidates = [i for i in allowed if not get_scheduler(multi_clients[i]).cooling_down] or allowed
+    load = lambda i: bytes_in_flight.get(i, 0)
+
+    # count the new stream as one part so an idle pool still follows the hash order
+    average = (sum(map(load, candidates)) + 1024 * 1024) / len(candidates)
+    for index in sorted(candidates, key=lambda i: _score(key, i), reverse=True):
+        if load(index) <= BALANCE_FACTOR * average:
+            return index
+    return min(candidates, key=load)
+
+#Dont Remove My Credit @MSLANDERS 
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -3,7 +3,8 @@ import logging
 from info import *
 from pyrogram import Client
 from web.utils.config_parser import TokenParser
-from web.server import multi_clients, work_loads, Webmslandersbot
+from web.utils.session_pool import get_pool
+from web.server import multi_clients, work_loads, bytes_in_flight, Webmslandersbot
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -11,9 +12,16 @@ from web.server import multi_clients, work_loads, Webmslandersbot
 async def initialize_clients():
     multi_clients[0] = Webmslandersbot
     work_loads[0] = 0
+    bytes_in_flight[0] = 0
     all_tokens = TokenParser().parse_from_env()
+    # every worker process starts its own share of the extra clients
+    all_tokens = dict(
+        (client_id, token) for client_id, token in all_tokens.items()
+        if client_id % WORKER_COUNT == WORKER_ID
+    )
     if not all_tokens:
         print("No additional clients found, using default client")
+        warm_up_sessions()
         return
     
     async def start_client(client_id, token):
@@ -32,6 +40,7 @@ async def initialize_clients():
                 in_memory=True
             ).start()
             work_loads[client_id] = 0
+            bytes_in_flight[client_id] = 0
             return client_id, client
         except Exception:
             logging.error(f"Failed starting Client - {client_id} Error:", exc_info=True)
@@ -43,6 +52,13 @@ async def initialize_clients():
         print("Multi-Client Mode Enabled")
     else:
         print("No additional clients were initialized, using default client")
+    warm_up_sessions()
+
+def warm_up_sessions():
+    # open media sessions in the background so the first viewer of each DC doesn't wait for them
+    for client in multi_clients.values():
+        pool = get_pool(client)
+        pool.warm_task = asyncio.create_task(pool.start(MEDIA_WARM_DCS))
  
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
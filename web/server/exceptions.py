@@ -6,3 +6,17 @@ class InvalidHash(Exception):
 
 class FIleNotFound(Exception):
     message = "File not found"
+
+class StreamInterrupted(Exception):
+    message = "Stream interrupted"
+
+class RangeNotSatisfiable(Exception):
+    message = "Range not satisfiable"
+
+class UnsupportedMedia(Exception):
+    message = "Unsupported media"
+
+    def __init__(self, message: str = None):
+        if message:
+            self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import logging
+from info import *
+from pyrogram import Client
+from typing import Dict
+from pyrogram.errors import FloodWait
+from web.utils import metrics
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+class ClientScheduler:
+    def __init__(self, rate: float, burst: int, client: Client = None):
+        """
+        Token bucket that paces the Telegram requests of one client to `rate` per
+        second with bursts of up to `burst`. A FloodWait puts the client in cooldown
+        and no request is sent until it is over.
+        """
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.flood_waits = 0
+        self.requests = 0
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def cooldown(self, seconds: float) -> None:
+        self.flood_waits += 1
+        metrics.flood_waits.inc(client=metrics.client_label(self.client))
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.cooldown_until:
+                await asyncio.sleep(self.cooldown_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.requests += 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Runs a Telegram request once a token is available, putting the client in
+        cooldown if it raises FloodWait. The FloodWait is re-raised to the caller.
+        """
+        await self.acquire()
+        try:
+            return await func(*args, **kwargs)
+        except FloodWait as e:
+            logging.warning(f"Flood wait {e.value}s, client cooling down")
+            self.cooldown(e.value)
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "flood_waits": self.flood_waits,
+            "cooldown": round(max(self.cooldown_until - time.monotonic(), 0), 1),
+        }
+
+
+schedulers: Dict[Client, ClientScheduler] = {}
+
+
+def get_scheduler(client: Client) -> ClientScheduler:
+    if client not in schedulers:
+        schedulers[client] = ClientScheduler(CLIENT_RATE, CLIENT_BURST, client)
+    return schedulers[client]
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -1,19 +1,48 @@
 import re, math, logging, secrets, mimetypes, time
+from typing import Tuple
 from info import *
 from aiohttp import web
 from aiohttp.http_exceptions import BadStatusLine
-from web.server import multi_clients, work_loads, Webmslandersbot
-from web.server.exceptions import FIleNotFound, InvalidHash
-from web.utils.custom_dl import ByteStreamer
+from web.server import multi_clients, work_loads, bytes_in_flight, Webmslandersbot
+from web.server.exceptions import FIleNotFound, InvalidHash, RangeNotSatisfiable, StreamInterrupted, UnsupportedMedia
+from web.server.balancer import pick_client
+from web.server.scheduler import get_scheduler
+from web.utils.custom_dl import ByteStreamer, class_cache, get_streamer
+from web.utils.striped_dl import get_stripe_workers, yield_striped
+from web.utils.failover_dl import yield_failover
+from web.utils.disk_cache import disk_cache, CachedFileResponse
+from web.utils.index_cache import index_cache, indexable
+from web.utils.memory_cache import hot_cache
+from web.utils.session_pool import get_pool
+from web.utils import metrics
+from web.utils.http_range import check_conditions, http_date, if_range_matches, make_etag, parse_range
 from utils import get_readable_time
 from web.utils import StartTime, __version__
-from web.utils.render_template import render_page
+from web.utils.render_template import get_page, page_cache
+from web.utils.static_assets import static_assets
+from web.utils.hls import get_playlist, get_segment
+from web.utils.faststart import get_faststart
+from web.utils.thumbnails import get_thumbnail, thumbnails
 
 routes = web.RouteTableDef()
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
+def parse_path(request: web.Request, suffix: str = "") -> Tuple[int, str]:
+    """
+    Returns the message id and secure hash of a media URL, either
+    "/{hash}{id}" or "/{id}[/name]?hash={hash}". `suffix` is dropped first.
+    """
+    path = request.match_info["path"]
+    if suffix and path.endswith(suffix):
+        path = path[:-len(suffix)]
+    match = re.search(r"^([a-zA-Z0-9_-]{6})(\d+)$", path)
+    # a long id alone also looks like a hash and an id, the query says which it is
+    if match and "hash" not in request.rel_url.query:
+        return int(match.group(2)), match.group(1)
+    return int(re.search(r"(\d+)(?:\/\S+)?", path).group(1)), request.rel_url.query.get("hash")
+
 @routes.get("/", allow_head=True)
 async def root_route_handler(_):
     return web.json_response(
@@ -28,22 +57,172 @@ async def root_route_handler(_):
                     sorted(work_loads.items(), key=lambda x: x[1], reverse=True)
                 )
             ),
+            "schedulers": dict(
+                ("bot" + str(c + 1), get_scheduler(client).stats())
+                for c, client in multi_clients.items()
+            ),
+            "memory_cache": hot_cache.stats(),
+            "page_cache": page_cache.stats(),
+            "thumb_cache": thumbnails.stats(),
+            "index_cache": index_cache.stats() if index_cache else None,
+            "file_cache": dict(
+                ("bot" + str(c + 1), class_cache[client].cached_file_ids.stats())
+                for c, client in multi_clients.items()
+                if client in class_cache
+            ),
             "version": __version__,
         }
     )
 
+@routes.get("/metrics")
+async def metrics_handler(_):
+    collect_metrics()
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+def collect_metrics():
+    """
+    Copies the live state of the clients and caches into the scrape-time metrics.
+    """
+    for index, client in multi_clients.items():
+        metrics.client_streams.set(work_loads.get(index, 0), client=index)
+        metrics.client_bytes_in_flight.set(bytes_in_flight.get(index, 0), client=index)
+        scheduler = get_scheduler(client)
+        metrics.client_cooldown.set(scheduler.stats()["cooldown"], client=index)
+        for dc_id, sessions in get_pool(client).sessions.items():
+            metrics.media_sessions.set(len(sessions), client=index, dc=dc_id)
+        if client in class_cache:
+            stats = class_cache[client].cached_file_ids.stats()
+            metrics.cache_hits.set(stats["hits"] + stats["negative_hits"], cache="file_id", client=index)
+            metrics.cache_misses.set(stats["misses"], cache="file_id", client=index)
+
+    caches = [("memory", hot_cache.stats())]
+    if disk_cache:
+        caches.append(("disk", disk_cache.stats()))
+    if index_cache:
+        caches.append(("index", index_cache.stats()))
+    for name, stats in caches:
+        metrics.cache_hits.set(stats["hits"], cache=name)
+        metrics.cache_misses.set(stats["misses"], cache=name)
+        metrics.cache_bytes.set(stats["bytes"], cache=name)
+
+    for name, cache in (("page", page_cache), ("thumb", thumbnails)):
+        stats = cache.stats()
+        metrics.cache_hits.set(stats["hits"], cache=name)
+        metrics.cache_misses.set(stats["misses"], cache=name)
+
+@routes.get("/static/{name}", allow_head=True)
+async def static_handler(request: web.Request):
+    asset = static_assets.get(request.match_info["name"])
+    if asset is None:
+        raise web.HTTPNotFound(text="404: Not found")
+    encoding, body, etag = asset.negotiate(request.headers.get("Accept-Encoding", ""))
+    headers = {
+        "Content-Type": asset.content_type,
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+    }
+    if check_conditions(request, etag, None) == 304:
+        return web.Response(status=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return web.Response(body=body, headers=headers)
+
+@routes.get(r"/hls/{path:\d+}/{name}", allow_head=True)
+async def hls_segment_handler(request: web.Request):
+    try:
+        started = time.monotonic()
+        id, secure_hash = parse_path(request)
+        segment = await get_segment(id, secure_hash, request.match_info["name"])
+        response = web.StreamResponse(headers={
+            "Content-Type": "video/mp4",
+            "Content-Length": str(segment.size),
+            "Cache-Control": "public, max-age=3600",
+        })
+        await response.prepare(request)
+        if request.method != "HEAD":
+            reader = segment.reader
+            await write_body(request, response, segment.body(), started, client=reader.index, dc=reader.file_id.dc_id)
+        return response
+    except InvalidHash as e:
+        raise web.HTTPForbidden(text=e.message)
+    except FIleNotFound as e:
+        raise web.HTTPNotFound(text=e.message)
+    except UnsupportedMedia as e:
+        raise web.HTTPUnsupportedMediaType(text=e.message)
+    except (AttributeError, BadStatusLine, ConnectionResetError):
+        pass
+    except Exception as e:
+        logging.critical(e.with_traceback(None))
+        raise web.HTTPInternalServerError(text=str(e))
+
+@routes.get(r"/hls/{path:\S+}", allow_head=True)
+async def hls_handler(request: web.Request):
+    try:
+        id, secure_hash = parse_path(request, ".m3u8")
+        return web.Response(
+            text=await get_playlist(id, secure_hash),
+            content_type="application/vnd.apple.mpegurl",
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+    except InvalidHash as e:
+        raise web.HTTPForbidden(text=e.message)
+    except FIleNotFound as e:
+        raise web.HTTPNotFound(text=e.message)
+    except UnsupportedMedia as e:
+        raise web.HTTPUnsupportedMediaType(text=e.message)
+    except (AttributeError, BadStatusLine, ConnectionResetError):
+        pass
+    except Exception as e:
+        logging.critical(e.with_traceback(None))
+        raise web.HTTPInternalServerError(text=str(e))
+
+@routes.get(r"/faststart/{path:\S+}", allow_head=True)
+async def faststart_handler(request: web.Request):
+    try:
+        id, secure_hash = parse_path(request)
+        return await media_streamer(request, id, secure_hash, faststart=True)
+    except InvalidHash as e:
+        raise web.HTTPForbidden(text=e.message)
+    except FIleNotFound as e:
+        raise web.HTTPNotFound(text=e.message)
+    except (AttributeError, BadStatusLine, ConnectionResetError):
+        pass
+    except Exception as e:
+        logging.critical(e.with_traceback(None))
+        raise web.HTTPInternalServerError(text=str(e))
+
+@routes.get(r"/thumb/{path:\S+}", allow_head=True)
+async def thumb_handler(request: web.Request):
+    try:
+        id, secure_hash = parse_path(request)
+        width = request.rel_url.query.get("w", "")
+        thumb = await get_thumbnail(id, secure_hash, int(width) if width.isdigit() else None)
+        # the thumbnail of a file never changes, and its URL carries the file hash
+        headers = {"ETag": thumb.etag, "Cache-Control": "public, max-age=31536000, immutable"}
+        if check_conditions(request, thumb.etag, None) == 304:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=thumb.data, content_type=thumb.content_type, headers=headers)
+    except InvalidHash as e:
+        raise web.HTTPForbidden(text=e.message)
+    except FIleNotFound as e:
+        raise web.HTTPNotFound(text=e.message)
+    except (AttributeError, BadStatusLine, ConnectionResetError):
+        pass
+    except Exception as e:
+        logging.critical(e.with_traceback(None))
+        raise web.HTTPInternalServerError(text=str(e))
+
 @routes.get(r"/watch/{path:\S+}", allow_head=True)
 async def stream_handler(request: web.Request):
     try:
-        path = request.match_info["path"]
-        match = re.search(r"^([a-zA-Z0-9_-]{6})(\d+)$", path)
-        if match:
-            secure_hash = match.group(1)
-            id = int(match.group(2))
-        else:
-            id = int(re.search(r"(\d+)(?:\/\S+)?", path).group(1))
-            secure_hash = request.rel_url.query.get("hash")
-        return web.Response(text=await render_page(id, secure_hash), content_type='text/html')
+        id, secure_hash = parse_path(request)
+        html, etag = await get_page(id, secure_hash)
+        headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+        condition = check_conditions(request, etag, None)
+        if condition:
+            return web.Response(status=condition, headers=headers)
+        return web.Response(text=html, content_type='text/html', headers=headers)
     except InvalidHash as e:
         raise web.HTTPForbidden(text=e.message)
     except FIleNotFound as e:
@@ -60,14 +239,7 @@ async def stream_handler(request: web.Request):
 @routes.get(r"/{path:\S+}", allow_head=True)
 async def stream_handler(request: web.Request):
     try:
-        path = request.match_info["path"]
-        match = re.search(r"^([a-zA-Z0-9_-]{6})(\d+)$", path)
-        if match:
-            secure_hash = match.group(1)
-            id = int(match.group(2))
-        else:
-            id = int(re.search(r"(\d+)(?:\/\S+)?", path).group(1))
-            secure_hash = request.rel_url.query.get("hash")
+        id, secure_hash = parse_path(request)
         return await media_streamer(request, id, secure_hash)
     except InvalidHash as e:
         raise web.HTTPForbidden(text=e.message)
@@ -79,27 +251,17 @@ async def stream_handler(request: web.Request):
         logging.critical(e.with_traceback(None))
         raise web.HTTPInternalServerError(text=str(e))
 
-class_cache = {}
-
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
-async def media_streamer(request: web.Request, id: int, secure_hash: str):
-    range_header = request.headers.get("Range", 0)
-    
-    index = min(work_loads, key=work_loads.get)
-    faster_client = multi_clients[index]
+async def media_streamer(request: web.Request, id: int, secure_hash: str, faststart: bool = False):
+    started = time.monotonic()
+    index = pick_client(id)
     
     if MULTI_CLIENT:
         logging.info(f"Client {index} is now serving {request.remote}")
 
-    if faster_client in class_cache:
-        tg_connect = class_cache[faster_client]
-        logging.debug(f"Using cached ByteStreamer object for client {index}")
-    else:
-        logging.debug(f"Creating new ByteStreamer object for client {index}")
-        tg_connect = ByteStreamer(faster_client)
-        class_cache[faster_client] = tg_connect
+    tg_connect = get_streamer(index)
     logging.debug("before calling get_file_properties")
     file_id = await tg_connect.get_file_properties(id)
     logging.debug("after calling get_file_properties")
@@ -109,34 +271,108 @@ async def media_streamer(request: web.Request, id: int, secure_hash: str):
         raise InvalidHash
     
     file_size = file_id.file_size
+    etag = make_etag(file_id.unique_id)
+    # a moov-at-end MP4 is served with its moov moved to the front
+    layout = await get_faststart(id, file_id) if faststart else None
+    if layout:
+        file_size = layout.size
+        etag = make_etag(f"{file_id.unique_id}-faststart")
+    last_modified = getattr(file_id, "date", None)
+    validators = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if last_modified:
+        validators["Last-Modified"] = http_date(last_modified)
 
-    if range_header:
-        from_bytes, until_bytes = range_header.replace("bytes=", "").split("-")
-        from_bytes = int(from_bytes)
-        until_bytes = int(until_bytes) if until_bytes else file_size - 1
-    else:
-        from_bytes = request.http_range.start or 0
-        until_bytes = (request.http_range.stop or file_size) - 1
+    condition = check_conditions(request, etag, last_modified)
+    if condition == 304:
+        return web.Response(status=304, headers=validators)
+    if condition == 412:
+        return web.Response(status=412, text="412: Precondition failed", headers=validators)
 
-    if (until_bytes > file_size) or (from_bytes < 0) or (until_bytes < from_bytes):
-        return web.Response(
-            status=416,
-            body="416: Range not satisfiable",
-            headers={"Content-Range": f"bytes */{file_size}"},
-        )
+    range_header = request.headers.get("Range")
+    ranges = None
+    if range_header and if_range_matches(request, etag, last_modified):
+        try:
+            ranges = parse_range(range_header, file_size)
+        except RangeNotSatisfiable as e:
+            return web.Response(
+                status=416,
+                text=f"416: {e.message}",
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
 
     chunk_size = 1024 * 1024
-    until_bytes = min(until_bytes, file_size - 1)
 
-    offset = from_bytes - (from_bytes % chunk_size)
-    first_part_cut = from_bytes - offset
-    last_part_cut = until_bytes % chunk_size + 1
+    async def fetch(offset, first_part_cut, last_part_cut, part_count):
+        if len(multi_clients) > 1 and STRIPE_CLIENTS > 1 and part_count * chunk_size >= STRIPE_MIN_SIZE:
+            workers = await get_stripe_workers(id, index, file_id)
+            logging.debug(f"Striping {part_count} parts of {id} over {len(workers)} clients")
+            parts = yield_striped(
+                workers, offset, first_part_cut, last_part_cut, part_count, chunk_size
+            )
+        else:
+            parts = tg_connect.yield_file(
+                file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size
+            )
+        parts = yield_failover(
+            id, index, parts, offset, first_part_cut, last_part_cut, part_count, chunk_size
+        )
+        try:
+            async for chunk in parts:
+                yield chunk
+        finally:
+            await parts.aclose()
 
-    req_length = until_bytes - from_bytes + 1
-    part_count = math.ceil(until_bytes / chunk_size) - math.floor(offset / chunk_size)
-    body = tg_connect.yield_file(
-        file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size
-    )
+    def telegram_body(from_bytes, until_bytes):
+        offset = from_bytes - (from_bytes % chunk_size)
+        first_part_cut = from_bytes - offset
+        last_part_cut = until_bytes % chunk_size + 1
+        part_count = until_bytes // chunk_size - offset // chunk_size + 1
+        if disk_cache:
+            return disk_cache.yield_file(
+                file_id.media_id, file_id.file_size, offset, first_part_cut, last_part_cut, part_count, fetch
+            )
+        return fetch(offset, first_part_cut, last_part_cut, part_count)
+
+    # the moov/Cues of the file, so players reading it don't wait on Telegram
+    regions = None
+    if index_cache and request.method != "HEAD" and indexable(file_id):
+        regions = await index_cache.get(file_id.media_id)
+        if regions is None:
+            index_cache.learn(id, file_id)
+
+    async def indexed_body(start, data, from_bytes, until_bytes):
+        end = min(until_bytes, start + len(data) - 1)
+        yield memoryview(data)[from_bytes - start:end - start + 1]
+        if end < until_bytes:
+            rest = telegram_body(end + 1, until_bytes)
+            try:
+                async for chunk in rest:
+                    yield chunk
+            finally:
+                await rest.aclose()
+
+    def file_body(from_bytes, until_bytes):
+        for start, data in regions or ():
+            if start <= from_bytes < start + len(data):
+                return indexed_body(start, data, from_bytes, until_bytes)
+        return telegram_body(from_bytes, until_bytes)
+
+    async def remuxed_body(from_bytes, until_bytes):
+        for in_moov, start, end in layout.pieces(from_bytes, until_bytes):
+            if in_moov:
+                yield memoryview(layout.moov)[start:end + 1]
+                continue
+            part = file_body(start, end)
+            try:
+                async for chunk in part:
+                    yield chunk
+            finally:
+                await part.aclose()
+
+    def range_body(from_bytes, until_bytes):
+        if layout:
+            return remuxed_body(from_bytes, until_bytes)
+        return file_body(from_bytes, until_bytes)
 
     mime_type = file_id.mime_type
     file_name = file_id.file_name
@@ -150,19 +386,109 @@ async def media_streamer(request: web.Request, id: int, secure_hash: str):
                 file_name = f"{secrets.token_hex(2)}.unknown"
     else:
         if file_name:
-            mime_type = mimetypes.guess_type(file_id.file_name)
+            mime_type = mimetypes.guess_type(file_id.file_name)[0] or "application/octet-stream"
         else:
             mime_type = "application/octet-stream"
             file_name = f"{secrets.token_hex(2)}.unknown"
 
-    return web.Response(
-        status=206 if range_header else 200,
-        body=body,
-        headers={
-            "Content-Type": f"{mime_type}",
-            "Content-Range": f"bytes {from_bytes}-{until_bytes}/{file_size}",
-            "Content-Length": str(req_length),
-            "Content-Disposition": f'{disposition}; filename="{file_name}"',
-            "Accept-Ranges": "bytes",
-        },
-  )
+    headers = {
+        "Content-Disposition": f'{disposition}; filename="{file_name}"',
+        "Accept-Ranges": "bytes",
+        **validators,
+    }
+
+    if ranges is None or len(ranges) == 1:
+        from_bytes, until_bytes = ranges[0] if ranges else (0, file_size - 1)
+        req_length = until_bytes - from_bytes + 1
+        status = 206 if ranges else 200
+        headers["Content-Type"] = f"{mime_type}"
+        headers["Content-Length"] = str(req_length)
+        if ranges:
+            headers["Content-Range"] = f"bytes {from_bytes}-{until_bytes}/{file_size}"
+
+        if not layout and disk_cache and req_length > 0 and disk_cache.has_parts(
+            file_id.media_id, from_bytes // chunk_size, until_bytes // chunk_size - from_bytes // chunk_size + 1
+        ):
+            logging.debug(f"Serving {id} from disk cache")
+            disk_cache.touch(file_id.media_id)
+            metrics.responses.inc(status=status, source="disk")
+            response = CachedFileResponse(
+                disk_cache.data_path(file_id.media_id), from_bytes, req_length,
+                status=status, headers=headers,
+            )
+            await response.prepare(request)
+            metrics.bytes_served.inc(req_length, client=index, dc=file_id.dc_id)
+            return response
+
+        body = range_body(from_bytes, until_bytes) if req_length > 0 else None
+    else:
+        boundary = secrets.token_hex(16)
+        part_headers = [
+            (
+                f"--{boundary}\r\nContent-Type: {mime_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+            ).encode()
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode()
+        status = 206
+        headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+        headers["Content-Length"] = str(
+            sum(len(h) + end - start + 1 + 2 for h, (start, end) in zip(part_headers, ranges)) + len(closing)
+        )
+
+        async def multipart_body():
+            for part_header, (start, end) in zip(part_headers, ranges):
+                yield part_header
+                part = range_body(start, end)
+                try:
+                    async for chunk in part:
+                        yield chunk
+                finally:
+                    await part.aclose()
+                yield b"\r\n"
+            yield closing
+
+        body = multipart_body()
+
+    metrics.responses.inc(status=status, source="telegram")
+    response = web.StreamResponse(status=status, headers=headers)
+    await response.prepare(request)
+    if body is not None and request.method != "HEAD":
+        await write_body(request, response, body, started, client=index, dc=file_id.dc_id)
+    return response
+
+async def write_body(request: web.Request, response: web.StreamResponse, body, started: float, **labels) -> None:
+    """
+    Writes the body in slices of at most STREAM_BUFFER_SIZE bytes, waiting for the
+    socket to drain after each one so a slow client holds back the upstream parts.
+    The body is closed as soon as the client goes away (or the handler is cancelled),
+    which stops its GetFile loop and releases its work_loads slot. If the body
+    can't be completed the connection is closed, so the client sees a short body:
+    once the headers are sent no error may turn into an HTTP error response.
+    """
+    if request.transport is not None:
+        request.transport.set_write_buffer_limits(high=STREAM_BUFFER_SIZE)
+    metrics.active_streams.inc()
+    first = True
+    try:
+        async for chunk in body:
+            if first:
+                metrics.ttfb.observe(time.monotonic() - started)
+                first = False
+            view = memoryview(chunk)
+            for start in range(0, len(view), STREAM_BUFFER_SIZE):
+                await response.write(view[start:start + STREAM_BUFFER_SIZE])
+            metrics.bytes_served.inc(len(view), **labels)
+        await response.write_eof()
+    except ConnectionResetError:
+        logging.debug(f"Client {request.remote} disconnected")
+    except StreamInterrupted as e:
+        logging.error(f"{e.message} for {request.remote}")
+        response.force_close()
+    except Exception as e:
+        logging.critical(f"Stream to {request.remote} failed after the headers were sent: {e!r}")
+        response.force_close()
+    finally:
+        metrics.active_streams.dec()
+        await body.aclose()
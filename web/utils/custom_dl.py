@@ -1,111 +1,75 @@
 import math
+import time
 import asyncio
 import logging
+from collections import deque
 from info import *
-from typing import Dict, Union
-from web.server import work_loads
+from typing import Union
+from web.server import multi_clients, work_loads, bytes_in_flight
+from web.server.balancer import pick_client
+from web.server.scheduler import get_scheduler
 from pyrogram import Client, utils, raw
 from web.utils.file_properties import get_file_ids
-from pyrogram.session import Session, Auth
-from pyrogram.errors import AuthBytesInvalid, FloodWait, RPCError
+from pyrogram.session import Session
+from pyrogram.errors import FloodWait, RPCError, FileReferenceExpired, FileReferenceInvalid
 from web.server.exceptions import FIleNotFound
 from pyrogram.file_id import FileId, FileType, ThumbnailSource
 import os
 from web.utils.safe_send import send
+from web.utils.memory_cache import hot_cache
+from web.utils.single_flight import SingleFlight
+from web.utils.ttl_cache import TTLCache, NEGATIVE
+from web.utils.session_pool import get_pool
+from web.utils import metrics
 
 # Dont Remove My Credit
 # @MSLANDERS
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
+class_cache = {}
+part_flights = SingleFlight()
+
 class ByteStreamer:
     def __init__(self, client: Client):
         """
         A custom class that holds the cache of a specific client and class functions.
         """
-        self.clean_timer = 30 * 60
         self.client: Client = client
-        self.cached_file_ids: Dict[int, FileId] = {}
-        asyncio.create_task(self.clean_cache())
+        self.sessions = get_pool(client)
+        self.scheduler = get_scheduler(client)
+        self.cached_file_ids = TTLCache(FILE_CACHE_SIZE, FILE_CACHE_TTL, FILE_CACHE_NEGATIVE_TTL)
+        self.file_flights = SingleFlight()
 
     async def get_file_properties(self, id: int) -> FileId:
-        if id not in self.cached_file_ids:
-            await self.generate_file_properties(id)
+        file_id = self.cached_file_ids.get(id)
+        if file_id is NEGATIVE:
+            logging.debug(f"Message with ID {id} is cached as not found")
+            raise FIleNotFound
+        if file_id is None:
+            file_id = await self.file_flights.do(id, self.generate_file_properties, id)
             logging.debug(f"Cached file properties for message with ID {id}")
-        return self.cached_file_ids[id]
+        return file_id
 
     async def generate_file_properties(self, id: int) -> FileId:
-        file_id = await get_file_ids(self.client, BIN_CHANNEL, id)
+        try:
+            file_id = await get_file_ids(self.client, BIN_CHANNEL, id)
+        except FIleNotFound:
+            file_id = None
         logging.debug(f"Generated file ID and Unique ID for message with ID {id}")
         if not file_id:
             logging.debug(f"Message with ID {id} not found")
+            self.cached_file_ids.set_negative(id)
             raise FIleNotFound
-        self.cached_file_ids[id] = file_id
+        setattr(file_id, "message_id", id)
+        self.cached_file_ids.set(id, file_id)
         logging.debug(f"Cached media message with ID {id}")
         return file_id
 
     async def generate_media_session(self, client: Client, file_id: FileId) -> Session:
         """
-        Generates the media session for the DC that contains the media file.
+        Returns the least busy pooled media session for the DC that contains the media file.
         """
-        media_session = client.media_sessions.get(file_id.dc_id, None)
-
-        if media_session is None:
-            # Trying direct or exported auth if different DC
-            try:
-                if file_id.dc_id != await client.storage.dc_id():
-                    media_session = Session(
-                        client,
-                        file_id.dc_id,
-                        await Auth(
-                            client,
-                            file_id.dc_id,
-                            await client.storage.test_mode()
-                        ).create(),
-                        await client.storage.test_mode(),
-                        is_media=True,
-                    )
-                    await media_session.start()
-
-                    for _ in range(6):
-                        exported_auth = await client.invoke(
-                            raw.functions.auth.ExportAuthorization(dc_id=file_id.dc_id)
-                        )
-                        try:
-                            await media_session.send(
-                                raw.functions.auth.ImportAuthorization(
-                                    id=exported_auth.id,
-                                    bytes=exported_auth.bytes,
-                                )
-                            )
-                            break
-                        except AuthBytesInvalid:
-                            logging.debug(f"Invalid authorization bytes for DC {file_id.dc_id}")
-                            continue
-                    else:
-                        await media_session.stop()
-                        raise AuthBytesInvalid
-
-                else:
-                    media_session = Session(
-                        client,
-                        file_id.dc_id,
-                        await client.storage.auth_key(),
-                        await client.storage.test_mode(),
-                        is_media=True,
-                    )
-                    await media_session.start()
-
-                logging.debug(f"Created media session for DC {file_id.dc_id}")
-                client.media_sessions[file_id.dc_id] = media_session
-
-            except Exception as e:
-                logging.error(f"Media session creation failed: {e}")
-                raise
-
-        else:
-            logging.debug(f"Using cached media session for DC {file_id.dc_id}")
-
-        return media_session
+        return await get_pool(client).get(file_id.dc_id)
 
     @staticmethod
     async def get_location(file_id: FileId) -> Union[
@@ -153,6 +117,180 @@ class ByteStreamer:
 
         return location
 
+    async def fetch_part(
+        self,
+        file_id: FileId,
+        location,
+        offset: int,
+        chunk_size: int,
+    ) -> Union[bytes, None]:
+        """
+        Returns a single part of the media file, looked up in the shared hot_cache first.
+        Concurrent requests for the same part share one GetFile call.
+        """
+        key = (file_id.media_id, offset, chunk_size)
+        data = hot_cache.get(key)
+        if data is not None:
+            return data
+
+        joined = key in part_flights
+        data = await part_flights.do(
+            key, self.request_part, file_id, location, offset, chunk_size
+        )
+        if data is None and joined:
+            # the shared call may have failed on another client, try on this one
+            data = await self.request_part(file_id, location, offset, chunk_size)
+        return data
+
+    async def request_part(
+        self,
+        file_id: FileId,
+        location,
+        offset: int,
+        chunk_size: int,
+    ) -> Union[bytes, None]:
+        """
+        Requests a single part of the media file from Telegram with safe retries.
+        Every attempt leases a session from the pool, so a retry after a dead
+        session was replaced goes out on the new one. While the client is cooling
+        down from a FloodWait the part is requested through another client.
+        An expired file reference is refreshed once and the same offset retried.
+        """
+        refreshed = False
+        for attempt in range(6):
+            # another request may have refreshed the shared FileId in the meantime
+            if getattr(location, "file_reference", file_id.file_reference) != file_id.file_reference:
+                location = await self.get_location(file_id)
+
+            if self.scheduler.cooling_down:
+                data = await self.reroute_part(file_id, offset, chunk_size)
+                if data is not None:
+                    return data
+
+            media_session = None
+            started = time.monotonic()
+            try:
+                async with self.sessions.use(file_id.dc_id) as media_session:
+                    r = await self.scheduler.call(
+                        media_session.send,
+                        raw.functions.upload.GetFile(
+                            location=location,
+                            offset=offset,
+                            limit=chunk_size
+                        )
+                    )
+                metrics.getfile_latency.observe(
+                    time.monotonic() - started, client=metrics.client_label(self.client), dc=file_id.dc_id
+                )
+                break
+            except (OSError, ConnectionResetError) as e:
+                logging.warning(f"Connection lost, retry {attempt+1}/6...")
+                self.count_error("connection", file_id)
+                if media_session and not await self.sessions.ping(media_session):
+                    await self.sessions.replace(file_id.dc_id, media_session)
+                await asyncio.sleep(2 ** attempt)
+            except FloodWait:
+                # the scheduler holds the next attempt until the cooldown is over
+                self.count_error("flood_wait", file_id)
+                continue
+            except (FileReferenceExpired, FileReferenceInvalid):
+                self.count_error("file_reference", file_id)
+                if refreshed or not await self.refresh_file_reference(file_id, location):
+                    logging.error(f"File reference of media {file_id.media_id} can't be refreshed")
+                    return None
+                refreshed = True
+        else:
+            logging.error("Failed to send after retries")
+            return None
+
+        if not isinstance(r, raw.types.upload.File):
+            logging.error("Unexpected type returned from Telegram")
+            return None
+
+        hot_cache.put((file_id.media_id, offset, chunk_size), r.bytes)
+        return r.bytes
+
+    async def get_thumbnail(self, file_id: FileId) -> Union[bytes, None]:
+        """
+        Downloads the thumbnail Telegram generated for the media in a single GetFile.
+        Thumbnails stay out of hot_cache, where they would share the key of the
+        first part of the file. Returns None for media without a thumbnail.
+        """
+        thumb_size = getattr(file_id, "thumb_size", "")
+        if not thumb_size:
+            return None
+        for refreshed in (False, True):
+            location = await self.get_location(file_id)
+            location.thumb_size = thumb_size
+            try:
+                async with self.sessions.use(file_id.dc_id) as media_session:
+                    r = await self.scheduler.call(
+                        media_session.send,
+                        raw.functions.upload.GetFile(location=location, offset=0, limit=1024 * 1024)
+                    )
+            except (FileReferenceExpired, FileReferenceInvalid):
+                self.count_error("file_reference", file_id)
+                if refreshed or not await self.refresh_file_reference(file_id, location):
+                    return None
+                continue
+            if isinstance(r, raw.types.upload.File):
+                return r.bytes
+            logging.error("Unexpected type returned from Telegram")
+            return None
+        return None
+
+    def count_error(self, error: str, file_id: FileId) -> None:
+        metrics.getfile_errors.inc(client=metrics.client_label(self.client), dc=file_id.dc_id, error=error)
+
+    async def refresh_file_reference(self, file_id: FileId, location) -> bool:
+        """
+        Refetches the message of an expired FileId and updates its file_reference in
+        place, so streams and cache entries holding it keep working. Concurrent
+        callers share one refetch, and a reference that was already replaced since
+        `location` was built isn't fetched again.
+        """
+        id = getattr(file_id, "message_id", None)
+        if id is None:
+            return False
+        if getattr(location, "file_reference", None) != file_id.file_reference:
+            return True
+
+        try:
+            fresh = await self.file_flights.do(
+                ("refresh", id), get_file_ids, self.client, BIN_CHANNEL, id, True
+            )
+        except Exception as e:
+            logging.warning(f"Couldn't refetch message {id}: {e}")
+            return False
+        logging.debug(f"Refreshed file reference of message with ID {id}")
+        file_id.file_reference = fresh.file_reference
+        return True
+
+    async def reroute_part(self, file_id: FileId, offset: int, chunk_size: int) -> Union[bytes, None]:
+        """
+        Requests a part through a client that isn't cooling down, using that client's
+        own FileId of the message. Returns None when no such client can serve it.
+        """
+        id = getattr(file_id, "message_id", None)
+        healthy = [
+            i for i, client in multi_clients.items()
+            if client is not self.client and not get_scheduler(client).cooling_down
+        ]
+        if id is None or not healthy:
+            return None
+
+        index = pick_client(id, exclude=[i for i in multi_clients if i not in healthy])
+        streamer = get_streamer(index)
+        try:
+            other_file_id = await streamer.get_file_properties(id)
+            logging.debug(f"Rerouting part at {offset} of message {id} to client {index}")
+            return await streamer.request_part(
+                other_file_id, await streamer.get_location(other_file_id), offset, chunk_size
+            )
+        except Exception as e:
+            logging.warning(f"Couldn't reroute part of message {id} to client {index}: {e}")
+            return None
+
     async def yield_file(
         self,
         file_id: FileId,
@@ -164,89 +302,91 @@ class ByteStreamer:
         chunk_size: int,
     ) -> Union[bytes, None]:
         """
-        Custom generator that yields the bytes of the media file with safe retries
+        Custom generator that yields the bytes of the media file with safe retries.
+
+        Up to READ_AHEAD upcoming parts are requested while the current one is
+        being sent. The depth grows when we have to wait on Telegram and shrinks
+        when the HTTP client is slower than Telegram, so a paused player stops
+        the read-ahead instead of downloading the rest of the range.
         """
-        client = self.client
         work_loads[index] += 1
+        remaining = part_count * chunk_size
+        bytes_in_flight[index] += remaining
         logging.debug(f"Starting to stream file with client {index}.")
 
+        pending = deque()
+
+        async def timed_fetch(part_offset: int):
+            started = time.monotonic()
+            data = await self.fetch_part(file_id, location, part_offset, chunk_size)
+            return data, time.monotonic() - started
+
         try:
-            media_session = await self.generate_media_session(client, file_id)
             location = await self.get_location(file_id)
 
+            depth = 1
+            latency = None
+            next_offset = offset
+            scheduled = 0
             current_part = 1
 
             while current_part <= part_count:
-                # Retry logic for Telegram connection errors
-                for attempt in range(6):
-                    try:
-                        r = await media_session.send(
-                            raw.functions.upload.GetFile(
-                                location=location,
-                                offset=offset,
-                                limit=chunk_size
-                            )
-                        )
-                        break
-                    except (OSError, ConnectionResetError) as e:
-                        logging.warning(f"Connection lost, retry {attempt+1}/6...")
-                        await asyncio.sleep(2 ** attempt)
-                    except FloodWait as e:
-                        logging.warning(f"Flood wait {e.x}s")
-                        await asyncio.sleep(e.x)
+                while len(pending) < depth and scheduled < part_count:
+                    pending.append(asyncio.ensure_future(timed_fetch(next_offset)))
+                    next_offset += chunk_size
+                    scheduled += 1
+
+                task = pending.popleft()
+                stalled = not task.done()
+                chunk, elapsed = await task
+                if not chunk:
+                    break
+
+                bytes_in_flight[index] -= chunk_size
+                remaining -= chunk_size
+                latency = elapsed if latency is None else 0.8 * latency + 0.2 * elapsed
+                if stalled:
+                    depth = min(depth + 1, READ_AHEAD)
+
+                # yield correct part
+                held = time.monotonic()
+                if part_count == 1:
+                    yield chunk[first_part_cut:last_part_cut]
+                elif current_part == 1:
+                    yield chunk[first_part_cut:]
+                elif current_part == part_count:
+                    yield chunk[:last_part_cut]
                 else:
-                    logging.error("Failed to send after retries")
-                    return
-
-                if not isinstance(r, raw.types.upload.File):
-                    logging.error("Unexpected type returned from Telegram")
-                    return
-
-                while True:
-                    chunk = r.bytes
-                    if not chunk:
-                        break
-
-                    # yield correct part
-                    if part_count == 1:
-                        yield chunk[first_part_cut:last_part_cut]
-                    elif current_part == 1:
-                        yield chunk[first_part_cut:]
-                    elif current_part == part_count:
-                        yield chunk[:last_part_cut]
-                    else:
-                        yield chunk
-
-                    current_part += 1
-                    offset += chunk_size
-
-                    if current_part > part_count:
-                        break
-
-                    # fetch next chunk
-                    r = await media_session.send(
-                        raw.functions.upload.GetFile(
-                            location=location,
-                            offset=offset,
-                            limit=chunk_size
-                        )
-                    )
+                    yield chunk
+                held = time.monotonic() - held
+
+                # the client took longer to accept the part than Telegram takes to send one
+                if held > latency:
+                    depth = max(depth - 1, 1)
+
+                current_part += 1
 
         except Exception as e:
             logging.error(f"Error while streaming: {e}")
 
         finally:
+            for task in pending:
+                task.cancel()
             work_loads[index] -= 1
+            bytes_in_flight[index] -= remaining
             logging.debug(f"Finished yielding file (client {index}).")
 
-    async def clean_cache(self) -> None:
-        """
-        function to clean the cache to reduce memory usage
-        """
-        while True:
-            await asyncio.sleep(self.clean_timer)
-            self.cached_file_ids.clear()
-            logging.debug("Cleaned the cache")
+def get_streamer(index: int) -> ByteStreamer:
+    """
+    Returns the cached ByteStreamer of the client at the given index, creating it if needed.
+    """
+    client = multi_clients[index]
+    if client in class_cache:
+        logging.debug(f"Using cached ByteStreamer object for client {index}")
+    else:
+        logging.debug(f"Creating new ByteStreamer object for client {index}")
+        class_cache[client] = ByteStreamer(client)
+    return class_cache[client]
 
 # Dont Remove My Credit
 # @MSLANDERS
@@ -0,0 +1,253 @@
+import os
+import asyncio
+import logging
+from info import *
+from aiohttp import web
+from collections import OrderedDict
+from typing import AsyncGenerator, Callable, Dict, Union
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+
+class DiskChunkCache:
+    def __init__(self, root: str, max_bytes: int, chunk_size: int = 1024 * 1024):
+        """
+        Persistent store of Telegram parts, one sparse data file per media id plus a
+        bitmap of the parts it holds. Whole files are evicted, least recently used first,
+        once the store grows past max_bytes.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.bitmaps: "OrderedDict[int, bytearray]" = OrderedDict()
+        self.sizes: Dict[int, int] = {}
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.pending: Dict[int, int] = {}
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self.load()
+
+    def data_path(self, media_id: int) -> str:
+        return os.path.join(self.root, f"{media_id}.data")
+
+    def map_path(self, media_id: int) -> str:
+        return os.path.join(self.root, f"{media_id}.map")
+
+    def load(self) -> None:
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".map"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                entries.append((os.path.getmtime(path), int(name[:-4])))
+            except ValueError:
+                continue
+
+        for _, media_id in sorted(entries):
+            with open(self.map_path(media_id), "rb") as f:
+                bitmap = bytearray(f.read())
+            self.bitmaps[media_id] = bitmap
+            self.sizes[media_id] = sum(bin(b).count("1") for b in bitmap) * self.chunk_size
+            self.total += self.sizes[media_id]
+        logging.info(f"Disk cache loaded {len(self.bitmaps)} files ({self.total} bytes)")
+
+    def has(self, media_id: int, part: int) -> bool:
+        bitmap = self.bitmaps.get(media_id)
+        return bool(bitmap) and part // 8 < len(bitmap) and bool(bitmap[part // 8] & (1 << part % 8))
+
+    def has_parts(self, media_id: int, first: int, count: int) -> bool:
+        return all(self.has(media_id, part) for part in range(first, first + count))
+
+    def touch(self, media_id: int) -> None:
+        if media_id in self.bitmaps:
+            self.bitmaps.move_to_end(media_id)
+
+    def _read(self, media_id: int, part: int, length: int) -> bytes:
+        with open(self.data_path(media_id), "rb") as f:
+            return os.pread(f.fileno(), length, part * self.chunk_size)
+
+    def _write(self, media_id: int, part: int, data: bytes) -> None:
+        fd = os.open(self.data_path(media_id), os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, data, part * self.chunk_size)
+        finally:
+            os.close(fd)
+
+    def _write_map(self, media_id: int, bitmap: bytes) -> None:
+        with open(self.map_path(media_id), "wb") as f:
+            f.write(bitmap)
+
+    async def read(self, media_id: int, part: int, length: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._read, media_id, part, length)
+
+    async def put(self, media_id: int, part: int, data: bytes) -> None:
+        if self.has(media_id, part) or not self.evict(keep=media_id, need=self.chunk_size):
+            return
+        # writes of a file are serialized, and evict leaves it alone until they are done
+        lock = self.locks.setdefault(media_id, asyncio.Lock())
+        self.pending[media_id] = self.pending.get(media_id, 0) + 1
+        try:
+            async with lock:
+                await self._put(media_id, part, data)
+        finally:
+            self.pending[media_id] -= 1
+            if not self.pending[media_id]:
+                del self.pending[media_id]
+                del self.locks[media_id]
+
+    async def _put(self, media_id: int, part: int, data: bytes) -> None:
+        if self.has(media_id, part):
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, media_id, part, data)
+        except OSError as e:
+            logging.warning(f"Disk cache write failed for {media_id}: {e}")
+            return
+
+        bitmap = self.bitmaps.setdefault(media_id, bytearray())
+        if len(bitmap) <= part // 8:
+            bitmap.extend(bytes(part // 8 + 1 - len(bitmap)))
+        bitmap[part // 8] |= 1 << part % 8
+        self.sizes[media_id] = self.sizes.get(media_id, 0) + self.chunk_size
+        self.total += self.chunk_size
+        self.touch(media_id)
+        try:
+            await loop.run_in_executor(None, self._write_map, media_id, bytes(bitmap))
+        except OSError as e:
+            logging.warning(f"Disk cache write failed for {media_id}: {e}")
+
+    def evict(self, keep: int = None, need: int = 0) -> bool:
+        """
+        Removes least recently used files until need more bytes fit in the budget,
+        skipping files that are being written. Returns False when no other file can
+        go and there is still no room.
+        """
+        while self.total + need > self.max_bytes:
+            media_id = next((m for m in self.bitmaps if m != keep and m not in self.pending), None)
+            if media_id is None:
+                return False
+            self.remove(media_id)
+        return True
+
+    def remove(self, media_id: int) -> None:
+        self.bitmaps.pop(media_id, None)
+        self.total -= self.sizes.pop(media_id, 0)
+        for path in (self.map_path(media_id), self.data_path(media_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        logging.debug(f"Evicted {media_id} from disk cache")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self.bitmaps),
+            "bytes": self.total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def yield_file(
+        self,
+        media_id: int,
+        file_size: int,
+        offset: int,
+        first_part_cut: int,
+        last_part_cut: int,
+        part_count: int,
+        fetch: Callable[[int, int, int, int], AsyncGenerator[bytes, None]],
+    ) -> Union[bytes, None]:
+        """
+        Yields the range from the parts on disk and only asks fetch for the missing runs,
+        storing every part it returns.
+        """
+        chunk_size = self.chunk_size
+        first = offset // chunk_size
+        self.touch(media_id)
+
+        def cut(n: int, chunk: bytes) -> bytes:
+            if part_count == 1:
+                return chunk[first_part_cut:last_part_cut]
+            elif n == 0:
+                return chunk[first_part_cut:]
+            elif n == part_count - 1:
+                return chunk[:last_part_cut]
+            return chunk
+
+        current = 0
+        while current < part_count:
+            part = first + current
+            if self.has(media_id, part):
+                length = min(chunk_size, file_size - part * chunk_size)
+                yield cut(current, await self.read(media_id, part, length))
+                self.hits += 1
+                current += 1
+                continue
+
+            run = 1
+            while current + run < part_count and not self.has(media_id, part + run):
+                run += 1
+
+            self.misses += run
+            got = 0
+            async for chunk in fetch(part * chunk_size, 0, chunk_size, run):
+                if len(chunk) == chunk_size or (part + got) * chunk_size + len(chunk) == file_size:
+                    await self.put(media_id, part + got, chunk)
+                yield cut(current + got, chunk)
+                got += 1
+
+            if got < run:
+                return
+            current += run
+
+
+class CachedFileResponse(web.StreamResponse):
+    def __init__(self, path: str, offset: int, count: int, **kwargs):
+        """
+        Sends a byte range of a cached file with zero-copy sendfile. Where the transport
+        doesn't support it (e.g. TLS) the loop falls back to reading and writing the file.
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.offset = offset
+        self.count = count
+
+    async def prepare(self, request: web.BaseRequest):
+        if self.prepared:
+            return await super().prepare(request)
+        writer = await super().prepare(request)
+        if request.method == "HEAD" or not self.count:
+            return writer
+
+        transport = request.transport
+        if transport is None:
+            raise ConnectionResetError("Connection lost")
+
+        # the headers are out, a failure can only cut the body short
+        try:
+            with open(self.path, "rb") as f:
+                await asyncio.get_running_loop().sendfile(transport, f, self.offset, self.count)
+            await super().write_eof()
+        except ConnectionError:
+            logging.debug(f"Client {request.remote} disconnected")
+        except OSError as e:
+            logging.error(f"Disk cache read failed for {request.remote}: {e}")
+            self.force_close()
+        return writer
+
+
+# every worker process keeps its own share of the cache, its index lives in memory
+disk_cache = DiskChunkCache(
+    os.path.join(DISK_CACHE_DIR, f"worker{WORKER_ID}") if WORKER_COUNT > 1 else DISK_CACHE_DIR,
+    DISK_CACHE_SIZE // WORKER_COUNT,
+) if DISK_CACHE_SIZE else None
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
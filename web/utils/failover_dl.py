@@ -0,0 +1,78 @@
+import logging
+from info import *
+from typing import AsyncGenerator, Union
+from web.server import multi_clients
+from web.server.balancer import pick_client
+from web.server.exceptions import StreamInterrupted
+from web.utils.custom_dl import get_streamer
+from web.utils import metrics
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+
+async def yield_failover(
+    id: int,
+    index: int,
+    parts: AsyncGenerator[bytes, None],
+    offset: int,
+    first_part_cut: int,
+    last_part_cut: int,
+    part_count: int,
+    chunk_size: int,
+) -> Union[bytes, None]:
+    """
+    Passes the bytes of `parts` through, counting them. If it stops before the end
+    of the range, the rest is requested from the current byte on another client
+    with that client's own FileId. Raises StreamInterrupted once every client
+    failed, so the response isn't finished as if it was complete.
+    """
+    position = offset + first_part_cut
+    end = offset + (part_count - 1) * chunk_size + last_part_cut
+    failed = [index]
+
+    async def resume(index: int, position: int):
+        try:
+            streamer = get_streamer(index)
+            file_id = await streamer.get_file_properties(id)
+        except Exception as e:
+            logging.warning(f"Client {index} can't resume message {id}: {e}")
+            return
+        resume_offset = position - position % chunk_size
+        parts = streamer.yield_file(
+            file_id,
+            index,
+            resume_offset,
+            position - resume_offset,
+            last_part_cut,
+            (end - 1) // chunk_size - resume_offset // chunk_size + 1,
+            chunk_size,
+        )
+        try:
+            async for chunk in parts:
+                yield chunk
+        finally:
+            await parts.aclose()
+
+    while True:
+        try:
+            async for chunk in parts:
+                position += len(chunk)
+                yield chunk
+        finally:
+            await parts.aclose()
+
+        if position >= end:
+            return
+        if len(failed) >= len(multi_clients):
+            logging.error(f"All clients failed streaming message {id} at byte {position}")
+            raise StreamInterrupted
+
+        metrics.failovers.inc(client=failed[-1])
+        index = pick_client(id, exclude=failed)
+        logging.warning(f"Client {failed[-1]} stopped at byte {position} of message {id}, resuming on client {index}")
+        failed.append(index)
+        parts = resume(index, position)
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
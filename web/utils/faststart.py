@@ -0,0 +1,150 @@
+import struct
+import asyncio
+import logging
+from info import *
+from typing import Iterator, NamedTuple, Optional, Tuple
+from pyrogram.errors import RPCError
+from pyrogram.file_id import FileId
+from web.server.balancer import pick_client
+from web.server.exceptions import StreamInterrupted, UnsupportedMedia
+from web.utils.index_cache import index_cache
+from web.utils.media_reader import MediaReader
+from web.utils.mp4 import TOP_LEVEL, parse_moov, rewrite_moov, top_level_boxes
+from web.utils.single_flight import SingleFlight
+from web.utils.ttl_cache import TTLCache, NEGATIVE
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+layouts = TTLCache(
+    FASTSTART_CACHE_SIZE, FILE_CACHE_TTL, FILE_CACHE_TTL,
+    max_bytes=FASTSTART_CACHE_MEMORY, weigh=lambda layout: len(layout.moov),
+)
+layout_flights = SingleFlight()
+
+
+class Faststart(NamedTuple):
+    """
+    An MP4 whose moov comes after its media data, served as if the moov had been
+    moved in front of the first mdat. `moov` is the moved box with its chunk
+    offsets rewritten, `size` the size of the remuxed file.
+    """
+    insert: int
+    moov_start: int
+    moov_size: int
+    moov: bytes
+    size: int
+
+    def pieces(self, from_bytes: int, until_bytes: int) -> Iterator[Tuple[bool, int, int]]:
+        """
+        Splits an inclusive range of the remuxed file into inclusive ranges of the
+        moov (True) or of the original file (False).
+        """
+        moved = len(self.moov)
+        segments = (
+            (0, self.insert, False, 0),
+            (self.insert, self.insert + moved, True, 0),
+            (self.insert + moved, self.moov_start + moved, False, self.insert),
+            (self.moov_start + moved, self.size, False, self.moov_start + self.moov_size),
+        )
+        for start, end, in_moov, source in segments:
+            low, high = max(from_bytes, start), min(until_bytes + 1, end)
+            if low < high:
+                yield in_moov, source + low - start, source + high - 1 - start
+
+
+def remux_moov(data: bytes, insert: int, moov_start: int) -> bytes:
+    """
+    Rewrites a moov for its new place at `insert`: the media data between insert
+    and the old moov moves down by the size of the new moov, the data after the
+    old moov by the difference of their sizes. The moov grows when an stco can't
+    hold the moved offsets and has to become a co64.
+    """
+    def move_by(size):
+        def move(offset):
+            if offset < insert:
+                return offset
+            if offset < moov_start:
+                return offset + size
+            return offset + size - len(data)
+        return move
+
+    try:
+        return rewrite_moov(data, move_by(len(data)))
+    except struct.error:
+        size = len(rewrite_moov(data, lambda offset: offset, co64=True))
+        return rewrite_moov(data, move_by(size), co64=True)
+
+
+async def read_moov(reader: MediaReader, start: int, size: int) -> bytes:
+    if index_cache:
+        for region_start, data in await index_cache.get(reader.file_id.media_id) or ():
+            if region_start == start and len(data) == size:
+                return data
+    return await reader.read(start, size)
+
+
+async def build_layout(id: int, file_id: FileId, max_boxes: int = 32) -> Optional[Faststart]:
+    """
+    Returns the faststart layout of a file, or None when it needs none: it isn't
+    an MP4, is fragmented, or its moov already comes before the media data.
+    """
+    reader = MediaReader(id, pick_client(id), file_id)
+    if (await reader.read(0, 8))[4:8].decode("latin-1") not in TOP_LEVEL:
+        return None
+    insert = moov = None
+    count = 0
+    try:
+        async for box in top_level_boxes(reader):
+            if box.type == "moov":
+                moov = box
+                break
+            if box.type == "moof":
+                return None
+            if box.type == "mdat" and insert is None:
+                insert = box.start
+            count += 1
+            if count >= max_boxes:
+                return None
+    except (ValueError, struct.error, UnsupportedMedia) as e:
+        logging.debug(f"Couldn't parse the boxes of message {id}: {e}")
+        return None
+    if moov is None or insert is None or moov.size > INDEX_MAX_SIZE:
+        return None
+
+    data = await read_moov(reader, moov.start, moov.size)
+    try:
+        if parse_moov(data).fragmented:
+            return None
+        moved = remux_moov(data, insert, moov.start)
+    except (ValueError, IndexError, struct.error, UnsupportedMedia) as e:
+        logging.debug(f"Couldn't remux the moov of message {id}: {e}")
+        return None
+    logging.debug(f"Moving the moov of message {id} from {moov.start} to {insert}")
+    return Faststart(insert, moov.start, moov.size, moved, reader.size - moov.size + len(moved))
+
+
+async def get_faststart(id: int, file_id: FileId) -> Optional[Faststart]:
+    """
+    Returns the faststart layout of a message, or None to serve it unchanged.
+    Layouts, and files that don't need one, are remembered per media. A file
+    whose boxes can't be read from Telegram is served unchanged this time.
+    """
+    media_id = file_id.media_id
+    layout = layouts.get(media_id)
+    if layout is NEGATIVE:
+        return None
+    if layout is None:
+        try:
+            layout = await layout_flights.do(media_id, build_layout, id, file_id)
+        except (RPCError, StreamInterrupted, ConnectionError, asyncio.TimeoutError) as e:
+            logging.warning(f"Couldn't read the boxes of message {id}, serving it unchanged: {getattr(e, 'message', e)}")
+            return None
+        if layout is None:
+            layouts.set_negative(media_id)
+        else:
+            layouts.set(media_id, layout)
+    return layout
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
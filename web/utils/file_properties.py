@@ -1,9 +1,14 @@
+import time
+import logging
 from pyrogram import Client
 from typing import Any, Optional
+from info import FILE_INDEX_MAX_AGE
+from database.files_db import file_index
 from pyrogram.types import Message
 from pyrogram.file_id import FileId
 from pyrogram.raw.types.messages import Messages
 from web.server.exceptions import FIleNotFound
+from web.server.scheduler import get_scheduler
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -21,17 +26,76 @@ async def parse_file_unique_id(message: "Messages") -> Optional[str]:
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
-async def get_file_ids(client: Client, chat_id: int, id: int) -> Optional[FileId]:
-    message = await client.get_messages(chat_id, id)
+async def get_file_ids(client: Client, chat_id: int, id: int, refresh: bool = False) -> Optional[FileId]:
+    if not refresh:
+        file_id = await get_indexed_file_id(client, chat_id, id)
+        if file_id:
+            return file_id
+    message = await get_scheduler(client).call(client.get_messages, chat_id, id)
     if message.empty:
         raise FIleNotFound
+    file_id = await get_file_id_from_message(message)
+    await index_file_id(client, chat_id, id, file_id)
+    return file_id
+
+async def get_file_id_from_message(message: "Message") -> FileId:
     media = get_media_from_message(message)
+    if not media:
+        raise FIleNotFound
     file_unique_id = await parse_file_unique_id(message)
     file_id = await parse_file_id(message)
     setattr(file_id, "file_size", getattr(media, "file_size", 0))
     setattr(file_id, "mime_type", getattr(media, "mime_type", ""))
     setattr(file_id, "file_name", getattr(media, "file_name", ""))
     setattr(file_id, "unique_id", file_unique_id)
+    setattr(file_id, "date", int(message.date.timestamp()) if message.date else None)
+    # the largest thumbnail Telegram generated for the media, served by /thumb
+    thumb = max(getattr(media, "thumbs", None) or [], key=lambda t: t.width * t.height, default=None)
+    setattr(file_id, "thumb_size", FileId.decode(thumb.file_id).thumbnail_size if thumb else "")
+    return file_id
+
+#Dont Remove My Credit @MSLANDERS 
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+async def index_message(client: Client, message: "Message") -> None:
+    """
+    Stores the file properties of a freshly ingested message in the file index.
+    A file_id only works for the bot that received it, so the message is indexed
+    for `client` alone; the other clients index it on their first lookup. Never
+    raises, the links can be sent without the index.
+    """
+    try:
+        file_id = await get_file_id_from_message(message)
+        await index_file_id(client, message.chat.id, message.id, file_id)
+    except Exception as e:
+        logging.warning(f"Couldn't index message {message.id}: {getattr(e, 'message', e)}")
+
+async def index_file_id(client: Client, chat_id: int, id: int, file_id: FileId) -> None:
+    try:
+        await file_index.save_file(await client.storage.user_id(), chat_id, id, file_id)
+    except Exception as e:
+        logging.warning(f"Couldn't index file properties of message {id}: {e}")
+
+async def get_indexed_file_id(client: Client, chat_id: int, id: int) -> Optional[FileId]:
+    """
+    Rebuilds the FileId of a message from the file index. Entries older than
+    FILE_INDEX_MAX_AGE are ignored so their file_reference gets refreshed, and
+    entries indexed before thumbnails were recorded so they get one.
+    """
+    try:
+        file = await file_index.get_file(await client.storage.user_id(), chat_id, id)
+    except Exception as e:
+        logging.warning(f"File index lookup for message {id} failed: {e}")
+        return None
+    if not file or time.time() - file["updated"] > FILE_INDEX_MAX_AGE or "thumb_size" not in file:
+        return None
+    file_id = FileId.decode(file["file_id"])
+    setattr(file_id, "file_size", file["file_size"])
+    setattr(file_id, "mime_type", file["mime_type"])
+    setattr(file_id, "file_name", file["file_name"])
+    setattr(file_id, "unique_id", file["unique_id"])
+    setattr(file_id, "date", file.get("date"))
+    setattr(file_id, "thumb_size", file["thumb_size"])
     return file_id
 
 def get_media_from_message(message: "Message") -> Any:
@@ -0,0 +1,138 @@
+import struct
+from bisect import bisect_left
+from typing import List, Tuple
+from web.utils.mp4 import SampleTable, box_header, find_box, iter_boxes, parse_header
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+# Fragmented MP4 writing, to serve a progressive MP4 as HLS: an init segment with
+# the moov of the file minus its sample tables, and media segments whose moof
+# describes samples that are copied byte for byte from the original mdat.
+
+SYNC_SAMPLE_FLAGS = 0x02000000  # depends on no other sample
+OTHER_SAMPLE_FLAGS = 0x01010000  # depends on others, not a sync sample
+STBL_PATH = ("mdia", "minf", "stbl")
+
+
+def make_box(kind: str, *payloads: bytes) -> bytes:
+    body = b"".join(payloads)
+    return box_header(kind, len(body)) + body
+
+
+def make_full_box(kind: str, version: int, flags: int, *payloads: bytes) -> bytes:
+    return make_box(kind, struct.pack(">I", version << 24 | flags), *payloads)
+
+
+EMPTY_SAMPLE_TABLES = (
+    make_full_box("stts", 0, 0, struct.pack(">I", 0))
+    + make_full_box("stsc", 0, 0, struct.pack(">I", 0))
+    + make_full_box("stsz", 0, 0, struct.pack(">II", 0, 0))
+    + make_full_box("stco", 0, 0, struct.pack(">I", 0))
+)
+
+
+def strip_samples(data: bytes, start: int, end: int, depth: int = 0) -> bytes:
+    """
+    Copies the boxes in data[start:end], the body of a trak, with the stbl
+    reduced to its sample descriptions and empty sample tables.
+    """
+    out = bytearray()
+    for box in iter_boxes(data, start, end):
+        if box.type != STBL_PATH[depth]:
+            out += data[box.start:box.end]
+        elif box.type == "stbl":
+            stsd = find_box(data, "stsd", box.body, box.end)
+            out += make_box("stbl", data[stsd.start:stsd.end], EMPTY_SAMPLE_TABLES)
+        else:
+            out += make_box(box.type, strip_samples(data, box.body, box.end, depth + 1))
+    return bytes(out)
+
+
+def init_segment(moov: bytes, tables: List[SampleTable]) -> bytes:
+    """
+    Returns the ftyp and moov of the fragmented copy of a file: its tracks without
+    samples, only those in `tables`, and an mvex announcing the fragments.
+    """
+    box = parse_header(moov, 0, len(moov))
+    kept = {table.trak.start for table in tables}
+    children = []
+    for child in iter_boxes(moov, box.body, box.end):
+        if child.type == "trak":
+            if child.start in kept:
+                children.append(make_box("trak", strip_samples(moov, child.body, child.end)))
+        elif child.type not in ("mvex", "iods"):
+            children.append(moov[child.start:child.end])
+    children.append(make_box("mvex", *(
+        make_full_box("trex", 0, 0, struct.pack(">5I", table.track.id, 1, 0, 0, 0)) for table in tables
+    )))
+    ftyp = make_box("ftyp", b"iso5", struct.pack(">I", 512), b"iso5iso6mp41")
+    return ftyp + make_box("moov", *children)
+
+
+def is_sync(table: SampleTable, sample: int) -> bool:
+    if table.sync is None:
+        return True
+    n = bisect_left(table.sync, sample)
+    return n < len(table.sync) and table.sync[n] == sample
+
+
+def make_traf(table: SampleTable, first: int, last: int, data_offset: int) -> bytes:
+    composition = table.composition
+    flags = 0x001 | 0x100 | 0x200 | 0x400 | (0x800 if composition else 0)
+    version = 1 if composition and min(composition[first:last], default=0) < 0 else 0
+    sample = struct.Struct(">IIIi" if composition else ">III")
+    entries = bytearray()
+    for n in range(first, last):
+        fields = (
+            table.times[n + 1] - table.times[n],
+            table.sizes[n],
+            SYNC_SAMPLE_FLAGS if is_sync(table, n) else OTHER_SAMPLE_FLAGS,
+        )
+        if composition:
+            offset = composition[n]
+            fields += (offset if version else offset - (offset >> 31 << 32),)
+        entries += sample.pack(*fields)
+    return make_box(
+        "traf",
+        make_full_box("tfhd", 0, 0x020000, struct.pack(">I", table.track.id)),
+        make_full_box("tfdt", 1, 0, struct.pack(">Q", table.times[first])),
+        make_full_box("trun", version, flags, struct.pack(">Ii", last - first, data_offset), bytes(entries)),
+    )
+
+
+def media_segment(sequence: int, samples: List[Tuple[SampleTable, int, int]]) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Returns the moof and mdat header of a media segment holding the samples
+    [first, last) of each table, and the (offset, size) ranges of the original
+    file that make up the rest of the mdat, in order.
+    """
+    sizes = [sum(table.sizes[first:last]) for table, first, last in samples]
+    mdat_header = box_header("mdat", sum(sizes))
+
+    def make_moof(data_offsets):
+        return make_box(
+            "moof",
+            make_full_box("mfhd", 0, 0, struct.pack(">I", sequence)),
+            *(make_traf(table, first, last, offset) for (table, first, last), offset in zip(samples, data_offsets)),
+        )
+
+    # the data offsets don't change the size of the moof
+    offset = len(make_moof([0] * len(samples))) + len(mdat_header)
+    data_offsets = []
+    for size in sizes:
+        data_offsets.append(offset)
+        offset += size
+
+    ranges = []
+    for table, first, last in samples:
+        for n in range(first, last):
+            start, size = table.offsets[n], table.sizes[n]
+            if ranges and ranges[-1][0] + ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + size)
+            else:
+                ranges.append((start, size))
+    return make_moof(data_offsets) + mdat_header, ranges
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
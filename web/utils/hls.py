@@ -0,0 +1,303 @@
+import re
+import math
+import asyncio
+import logging
+from bisect import bisect_left
+from info import *
+from typing import AsyncIterator, List, NamedTuple, Tuple
+from web.server.exceptions import FIleNotFound, InvalidHash, UnsupportedMedia
+from web.utils.fmp4 import init_segment, media_segment
+from web.utils.media_reader import MediaReader
+from web.utils.mp4 import Fragment, SampleTable, find_moov, fragment_index, parse_moov, read_box, sample_tables
+from web.utils.single_flight import SingleFlight
+from web.utils.ttl_cache import TTLCache, NEGATIVE
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+PART_SIZE = 1024 * 1024  # the Telegram parts the caches hold
+SEGMENT_SLACK = 1.5  # a segment may grow to this many times HLS_SEGMENT_DURATION to end on a part boundary
+SEGMENT_READAHEAD = 10  # segments cut at once from an MP4 whose sample tables aren't kept
+
+playlists = TTLCache(HLS_CACHE_SIZE, HLS_CACHE_TTL, HLS_CACHE_TTL)
+playlist_flights = SingleFlight()
+# the sample tables of progressive MP4s, needed for each of their segments
+remuxes = TTLCache(HLS_CACHE_SIZE, HLS_CACHE_TTL, max_bytes=HLS_TABLE_MEMORY, weigh=lambda remux: remux.nbytes)
+remux_flights = SingleFlight()
+# the segments cut from MP4s whose sample tables are too large to keep
+segments = TTLCache(HLS_CACHE_SIZE * SEGMENT_READAHEAD, HLS_CACHE_TTL, max_bytes=HLS_SEGMENT_MEMORY, weigh=lambda cut: cut.nbytes)
+
+
+class Cut(NamedTuple):
+    """
+    A segment of a remuxed MP4: its moof and mdat header and the byte ranges of
+    the original file that follow them.
+    """
+    head: bytes
+    ranges: List[Tuple[int, int]]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.head) + 16 * len(self.ranges)
+
+
+class Remux(NamedTuple):
+    """
+    A progressive MP4 served as fragmented MP4: its init segment, its sample
+    tables (the main track first) and the samples of the main track that
+    segments start at.
+    """
+    init: bytes
+    tables: List[SampleTable]
+    cuts: List[int]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.init) + sum(table.nbytes for table in self.tables) + 8 * len(self.cuts)
+
+    def bound(self, table: SampleTable, cut: int) -> int:
+        """
+        Returns the first sample of `table` in the segment starting at cut number `cut`.
+        """
+        main = self.tables[0]
+        if cut == 0:
+            return 0
+        if cut == len(self.cuts):
+            return table.count
+        if table is main:
+            return self.cuts[cut]
+        time = main.times[self.cuts[cut]] * table.track.timescale / main.track.timescale
+        return bisect_left(table.times, time, 0, table.count)
+
+    def duration(self, n: int) -> float:
+        main = self.tables[0]
+        return (main.times[self.bound(main, n + 1)] - main.times[self.cuts[n]]) / main.track.timescale
+
+    def segment(self, n: int) -> Cut:
+        samples = [(table, self.bound(table, n), self.bound(table, n + 1)) for table in self.tables]
+        return Cut(*media_segment(n + 1, samples))
+
+
+class Segment(NamedTuple):
+    head: bytes
+    ranges: List[Tuple[int, int]]
+    reader: MediaReader
+
+    @property
+    def size(self) -> int:
+        return len(self.head) + sum(size for _, size in self.ranges)
+
+    async def body(self) -> AsyncIterator[bytes]:
+        yield self.head
+        for offset, size in self.ranges:
+            yield await self.reader.read(offset, size)
+
+
+def grid_distance(offset: int) -> int:
+    return min(offset % PART_SIZE, -offset % PART_SIZE)
+
+
+def cut_segments(fragments: List[Fragment], target: float) -> List[int]:
+    """
+    Returns the indexes of the fragments segments start at. A segment ends at the
+    first keyframe fragment after `target` seconds, or at a later one up to
+    SEGMENT_SLACK times target if that one starts closer to a part boundary, so
+    segments share fewer parts and are served from whole cached parts.
+    """
+    if target <= 0:
+        raise ValueError(f"HLS_SEGMENT_DURATION must be positive, got {target}")
+    cuts = [0]
+    start = 0
+    while True:
+        end, duration = start, 0.0
+        while end < len(fragments) and (duration < target or not fragments[end].keyframe):
+            duration += fragments[end].duration
+            end += 1
+        if end >= len(fragments):
+            return cuts
+        best, distance = end, grid_distance(fragments[end].start)
+        while distance and end + 1 < len(fragments):
+            duration += fragments[end].duration
+            end += 1
+            if duration > target * SEGMENT_SLACK:
+                break
+            if fragments[end].keyframe and grid_distance(fragments[end].start) < distance:
+                best, distance = end, grid_distance(fragments[end].start)
+        cuts.append(best)
+        start = best
+
+
+def make_playlist(init: str, segments: List[Tuple[float, str]]) -> str:
+    """
+    Builds a VOD playlist. URIs may be followed by a byte range, as in
+    "uri@size@offset".
+    """
+    def split(uri):
+        uri, _, byterange = uri.partition("@")
+        return uri, byterange
+
+    init_uri, init_range = split(init)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{max(math.ceil(max(d for d, _ in segments)), 1)}",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f'#EXT-X-MAP:URI="{init_uri}"' + (f',BYTERANGE="{init_range}"' if init_range else ""),
+    ]
+    for duration, uri in segments:
+        uri, byterange = split(uri)
+        lines.append(f"#EXTINF:{duration:.3f},")
+        if byterange:
+            lines.append(f"#EXT-X-BYTERANGE:{byterange}")
+        lines.append(uri)
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def fragmented_playlist(uri: str, init_end: int, fragments: List[Fragment]) -> str:
+    cuts = cut_segments(fragments, HLS_SEGMENT_DURATION)
+    segments = []
+    for first, last in zip(cuts, cuts[1:] + [len(fragments)]):
+        start = fragments[first].start
+        end = fragments[last - 1].start + fragments[last - 1].size
+        duration = sum(fragment.duration for fragment in fragments[first:last])
+        segments.append((duration, f"{uri}@{end - start}@{start}"))
+    return make_playlist(f"{uri}@{init_end}@0", segments)
+
+
+def build_remux(moov: bytes) -> Remux:
+    """
+    Reads the sample tables of a progressive MP4 and cuts its main track, the
+    video if there is one, into segments on its sync samples.
+    """
+    tables = sample_tables(moov)
+    tables.sort(key=lambda table: table.track.handler != "vide")
+    main = tables[0]
+    if main.sync is not None:
+        starts = sorted({0, *main.sync})
+    else:
+        # every sample is a sync sample, offer a cut every second
+        starts, second = [], 0
+        for n in range(main.count):
+            if main.times[n] >= second * main.track.timescale:
+                starts.append(n)
+                second = main.times[n] // main.track.timescale + 1
+    starts = [n for n in starts if n < main.count]
+    fragments = [
+        Fragment(main.offsets[n], 0, (main.times[next_n] - main.times[n]) / main.track.timescale)
+        for n, next_n in zip(starts, starts[1:] + [main.count])
+    ]
+    cuts = [starts[n] for n in cut_segments(fragments, HLS_SEGMENT_DURATION)]
+    return Remux(init_segment(moov, tables), tables, cuts)
+
+
+async def get_remux(reader: MediaReader) -> Remux:
+    media_id = reader.file_id.media_id
+    remux = remuxes.get(media_id)
+    if remux is None:
+        remux = await remux_flights.do(media_id, load_remux, reader)
+        remuxes.set(media_id, remux)
+    return remux
+
+
+async def load_remux(reader: MediaReader) -> Remux:
+    box = await find_moov(reader)
+    if box is None or box.size > INDEX_MAX_SIZE:
+        raise UnsupportedMedia("HLS needs an MP4")
+    moov = await read_box(reader, box)
+    loop = asyncio.get_running_loop()
+    # expanding the sample tables of a long file takes a while
+    remux = await loop.run_in_executor(None, build_remux, moov)
+    if remuxes.max_bytes and remux.nbytes > remuxes.max_bytes:
+        logging.warning(
+            f"Sample tables of message {reader.id} take {remux.nbytes} bytes, over HLS_TABLE_MEMORY, "
+            f"its HLS segments are cut {SEGMENT_READAHEAD} at a time"
+        )
+    return remux
+
+
+async def build_playlist(reader: MediaReader, secure_hash: str) -> str:
+    head = await reader.read(0, 8)
+    box = head[4:8] == b"ftyp" and await find_moov(reader)
+    if not box:
+        raise UnsupportedMedia("HLS needs an MP4")
+    if parse_moov(await read_box(reader, box)).fragmented:
+        init_end, fragments = await fragment_index(reader)
+        if not fragments:
+            raise UnsupportedMedia("Fragmented MP4 without fragments")
+        logging.debug(f"Indexed {len(fragments)} fragments of message {reader.id} for HLS")
+        return fragmented_playlist(f"/{reader.id}?hash={secure_hash}", init_end, fragments)
+
+    remux = await get_remux(reader)
+    logging.debug(f"Cut message {reader.id} into {len(remux.cuts)} HLS segments")
+    uri = f"/hls/{reader.id}"
+    return make_playlist(
+        f"{uri}/init.mp4?hash={secure_hash}",
+        [(remux.duration(n), f"{uri}/{n}.m4s?hash={secure_hash}") for n in range(len(remux.cuts))],
+    )
+
+
+async def get_playlist(id: int, secure_hash: str) -> str:
+    """
+    Returns the HLS playlist of an MP4 message. Segments of a fragmented MP4 are
+    byte ranges of the media URL, cut on keyframe fragments, so players fetch them
+    through the same range requests and part caches as progressive playback. A
+    progressive MP4 is cut on its keyframes and served as fragmented MP4 by
+    get_segment. Other files (MKV) raise UnsupportedMedia, which is remembered
+    like the playlists.
+    """
+    reader = await MediaReader.open(id)
+    if reader.file_id.unique_id[:6] != secure_hash:
+        raise InvalidHash
+
+    playlist = playlists.get(id)
+    if playlist is NEGATIVE:
+        raise UnsupportedMedia("HLS needs an MP4")
+    if playlist is None:
+        try:
+            playlist = await playlist_flights.do(id, build_playlist, reader, secure_hash)
+        except UnsupportedMedia:
+            playlists.set_negative(id)
+            raise
+        playlists.set(id, playlist)
+    return playlist
+
+
+async def get_segment(id: int, secure_hash: str, name: str) -> Segment:
+    """
+    Returns the init segment ("init.mp4") or a media segment ("{n}.m4s") of the
+    fragmented copy of a progressive MP4.
+    """
+    reader = await MediaReader.open(id)
+    if reader.file_id.unique_id[:6] != secure_hash:
+        raise InvalidHash
+    match = re.fullmatch(r"(?:(init)\.mp4|(\d+)\.m4s)", name)
+    if not match:
+        raise FIleNotFound
+    media_id = reader.file_id.media_id
+    cut = segments.get((media_id, name))
+    if cut is None:
+        remux = await get_remux(reader)
+        if match.group(1):
+            first, cut = 0, Cut(remux.init, [])
+        else:
+            first = int(match.group(2))
+            if first >= len(remux.cuts):
+                raise FIleNotFound
+            cut = remux.segment(first)
+        if media_id not in remuxes:
+            # the tables weren't kept: cut the segments the player fetches next as well
+            segments.set((media_id, "init.mp4"), Cut(remux.init, []))
+            for n in range(first, min(first + SEGMENT_READAHEAD, len(remux.cuts))):
+                segments.set((media_id, f"{n}.m4s"), cut if f"{n}.m4s" == name else remux.segment(n))
+    head, ranges = cut
+    if ranges:
+        # the tracks are read one after the other, keep the parts they share
+        start = min(offset for offset, _ in ranges)
+        end = max(offset + size for offset, size in ranges)
+        reader.max_parts = max(reader.max_parts, (end - start) // reader.chunk_size + 2)
+    return Segment(head, ranges, reader)
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -0,0 +1,131 @@
+from aiohttp import web
+from typing import List, Optional, Tuple
+from email.utils import formatdate, parsedate_to_datetime
+from web.server.exceptions import RangeNotSatisfiable
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+MAX_RANGES = 16
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses a Range header (RFC 9110 section 14.2) into sorted, merged and inclusive
+    (start, end) pairs. Returns None when the header must be ignored and the whole
+    file served, and raises RangeNotSatisfiable when no range overlaps the file.
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, sep, last = spec.partition("-")
+        first, last = first.strip(), last.strip()
+        if not sep or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+            return None
+
+        if first == "":
+            # suffix range: the last N bytes
+            if last == "":
+                return None
+            length = int(last)
+            if length and size:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last), size - 1) if last else size - 1))
+
+    if not ranges:
+        raise RangeNotSatisfiable
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def make_etag(unique_id: str) -> str:
+    return f'"{unique_id}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _etag_list(value: str) -> List[str]:
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+def _weak_match(tags: List[str], etag: str) -> bool:
+    strip = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    return "*" in tags or strip(etag) in map(strip, tags)
+
+
+def check_conditions(request: web.BaseRequest, etag: str, last_modified: Optional[float]) -> Optional[int]:
+    """
+    Evaluates If-Match, If-Unmodified-Since, If-None-Match and If-Modified-Since in
+    the order of RFC 9110 section 13.2.2. Returns 412 or 304 when the request must
+    stop there, None when it should be served.
+    """
+    headers = request.headers
+    read_only = request.method in ("GET", "HEAD")
+
+    if "If-Match" in headers:
+        tags = _etag_list(headers["If-Match"])
+        if "*" not in tags and etag not in tags:
+            return 412
+    elif "If-Unmodified-Since" in headers and last_modified is not None:
+        since = parse_http_date(headers["If-Unmodified-Since"])
+        if since is not None and int(last_modified) > since:
+            return 412
+
+    if "If-None-Match" in headers:
+        if _weak_match(_etag_list(headers["If-None-Match"]), etag):
+            return 304 if read_only else 412
+    elif "If-Modified-Since" in headers and read_only and last_modified is not None:
+        since = parse_http_date(headers["If-Modified-Since"])
+        if since is not None and int(last_modified) <= since:
+            return 304
+
+    return None
+
+
+def if_range_matches(request: web.BaseRequest, etag: str, last_modified: Optional[float]) -> bool:
+    """
+    Returns False when If-Range no longer matches the file, so the Range header must
+    be ignored. ETags are compared strongly and dates must match exactly.
+    """
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    value = value.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag
+    since = parse_http_date(value)
+    return since is not None and last_modified is not None and int(last_modified) == since
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
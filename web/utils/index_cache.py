@@ -0,0 +1,240 @@
+import os
+import struct
+import asyncio
+import logging
+from info import *
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from pyrogram.file_id import FileId
+from web.server.exceptions import UnsupportedMedia
+from web.utils.media_reader import MediaReader
+from web.utils.mkv import cues_region
+from web.utils.mp4 import MATROSKA_MAGIC, TOP_LEVEL, find_moov
+from web.utils.single_flight import SingleFlight
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+Region = Tuple[int, bytes]
+REGION_HEADER = struct.Struct(">QQ")
+MAX_ABSENT = 10000  # files known to have no index, remembered in memory only
+
+
+def indexable(file_id: FileId) -> bool:
+    """
+    Only video and audio files have an index worth keeping, not documents or archives.
+    """
+    mime_type = getattr(file_id, "mime_type", None) or ""
+    return mime_type.startswith(("video/", "audio/"))
+
+
+async def find_index(reader: MediaReader) -> List[Region]:
+    """
+    Returns the MP4 moov box or the Matroska Cues of a file as (offset, bytes),
+    or nothing for other files and indexes larger than INDEX_MAX_SIZE.
+    """
+    head = await reader.read(0, 8)
+    try:
+        if head[:4] == MATROSKA_MAGIC:
+            region = await cues_region(reader)
+        elif head[4:8].decode("latin-1") in TOP_LEVEL:
+            box = await find_moov(reader)
+            region = box and (box.start, box.size)
+        else:
+            region = None
+    except (ValueError, IndexError, struct.error, UnsupportedMedia) as e:
+        logging.debug(f"Couldn't parse the container of message {reader.id}: {e}")
+        region = None
+    if not region or region[1] > INDEX_MAX_SIZE or region[0] + region[1] > reader.size:
+        return []
+    return [(region[0], await reader.read(*region))]
+
+
+class IndexCache:
+    def __init__(self, root: str, max_bytes: int, memory_bytes: int):
+        """
+        Persistent store of the container index of each file: the moov box of an
+        MP4 or the Cues of a Matroska file, which players read (often from the end
+        of the file) before they can start playing or seek. An index is located in
+        the background the first time a video or audio file is streamed and kept
+        in {media_id}.idx; the last MAX_ABSENT files without one are remembered in
+        memory. Whole files are evicted, least recently used first, past max_bytes,
+        and the most recently used indexes are also kept in memory up to memory_bytes.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.files: "OrderedDict[int, int]" = OrderedDict()
+        self.memory: "OrderedDict[int, List[Region]]" = OrderedDict()
+        self.memory_total = 0
+        self.absent: "OrderedDict[int, None]" = OrderedDict()
+        self.total = 0
+        self.flights = SingleFlight()
+        self.tasks = set()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self.load()
+
+    def path(self, media_id: int) -> str:
+        return os.path.join(self.root, f"{media_id}.idx")
+
+    def load(self) -> None:
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".idx"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                entries.append((os.path.getmtime(path), int(name[:-4]), os.path.getsize(path)))
+            except ValueError:
+                continue
+        for _, media_id, size in sorted(entries):
+            if not size:
+                # an empty file marked a file without an index, these now live in memory
+                os.remove(self.path(media_id))
+                continue
+            self.files[media_id] = size
+            self.total += size
+        logging.info(f"Index cache loaded {len(self.files)} files ({self.total} bytes)")
+
+    @staticmethod
+    def _read(path: str) -> List[Region]:
+        with open(path, "rb") as f:
+            data = f.read()
+        regions = []
+        pos = 0
+        while pos + REGION_HEADER.size <= len(data):
+            start, length = REGION_HEADER.unpack_from(data, pos)
+            pos += REGION_HEADER.size
+            regions.append((start, data[pos:pos + length]))
+            pos += length
+        return regions
+
+    @staticmethod
+    def _write(path: str, regions: List[Region]) -> None:
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            for start, data in regions:
+                f.write(REGION_HEADER.pack(start, len(data)))
+                f.write(data)
+        os.replace(temp, path)
+
+    async def get(self, media_id: int) -> Optional[List[Region]]:
+        """
+        Returns the index regions of a file, an empty list for a file known to have
+        none, or None when it hasn't been located yet.
+        """
+        if media_id in self.absent:
+            self.absent.move_to_end(media_id)
+            self.hits += 1
+            return []
+        regions = self.memory.get(media_id)
+        if regions is not None:
+            self.memory.move_to_end(media_id)
+            self.files.move_to_end(media_id)
+            self.hits += 1
+            return regions
+        if media_id not in self.files:
+            self.misses += 1
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            regions = await loop.run_in_executor(None, self._read, self.path(media_id))
+        except OSError as e:
+            logging.warning(f"Index cache read failed for {media_id}: {e}")
+            self.remove(media_id)
+            self.misses += 1
+            return None
+        self.files.move_to_end(media_id)
+        self.hits += 1
+        self.remember(media_id, regions)
+        return regions
+
+    def remember(self, media_id: int, regions: List[Region]) -> None:
+        size = sum(len(data) for _, data in regions)
+        if size > self.memory_bytes:
+            return
+        self.memory_total -= sum(len(data) for _, data in self.memory.pop(media_id, ()))
+        self.memory[media_id] = regions
+        self.memory_total += size
+        while self.memory_total > self.memory_bytes:
+            _, dropped = self.memory.popitem(last=False)
+            self.memory_total -= sum(len(data) for _, data in dropped)
+
+    async def put(self, media_id: int, regions: List[Region]) -> None:
+        if not regions:
+            self.absent[media_id] = None
+            self.absent.move_to_end(media_id)
+            while len(self.absent) > MAX_ABSENT:
+                self.absent.popitem(last=False)
+            return
+        size = sum(REGION_HEADER.size + len(data) for _, data in regions)
+        if size > self.max_bytes:
+            return
+        while self.total + size > self.max_bytes:
+            self.remove(next(iter(self.files)))
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, self.path(media_id), regions)
+        except OSError as e:
+            logging.warning(f"Index cache write failed for {media_id}: {e}")
+            return
+        self.total += size - self.files.pop(media_id, 0)
+        self.files[media_id] = size
+        self.remember(media_id, regions)
+
+    def remove(self, media_id: int) -> None:
+        self.total -= self.files.pop(media_id, 0)
+        for _, data in self.memory.pop(media_id, ()):
+            self.memory_total -= len(data)
+        try:
+            os.remove(self.path(media_id))
+        except FileNotFoundError:
+            pass
+
+    def learn(self, id: int, file_id: FileId) -> None:
+        """
+        Starts locating the index of a video or audio file that hasn't been seen
+        before.
+        """
+        media_id = file_id.media_id
+        if not indexable(file_id):
+            return
+        if media_id in self.files or media_id in self.absent or media_id in self.flights:
+            return
+        task = asyncio.ensure_future(self.flights.do(media_id, self.locate, id, media_id))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def locate(self, id: int, media_id: int) -> None:
+        try:
+            reader = await MediaReader.open(id)
+            regions = await find_index(reader)
+        except Exception as e:
+            # a Telegram failure isn't remembered, the next stream tries again
+            logging.warning(f"Couldn't locate the index of message {id}: {e}")
+            return
+        await self.put(media_id, regions)
+        logging.debug(f"Indexed message {id}: {[(start, len(data)) for start, data in regions]}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self.files),
+            "bytes": self.total,
+            "max_bytes": self.max_bytes,
+            "memory_bytes": self.memory_total,
+            "absent": len(self.absent),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+index_cache = IndexCache(
+    os.path.join(INDEX_CACHE_DIR, f"worker{WORKER_ID}") if WORKER_COUNT > 1 else INDEX_CACHE_DIR,
+    INDEX_CACHE_SIZE // WORKER_COUNT,
+    INDEX_CACHE_MEMORY,
+) if INDEX_CACHE_SIZE else None
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
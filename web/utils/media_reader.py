@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from pyrogram.file_id import FileId
+from web.server.balancer import pick_client
+from web.server.exceptions import StreamInterrupted
+from web.utils.custom_dl import get_streamer
+from web.utils.disk_cache import disk_cache
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+
+class MediaReader:
+    def __init__(self, id: int, index: int, file_id: FileId, chunk_size: int = 1024 * 1024, max_parts: int = 8):
+        """
+        Random access to the bytes of a message for parsing container indexes. Parts
+        come through ByteStreamer.yield_file and the disk cache like any stream, and
+        the last max_parts are kept so nearby reads share one GetFile.
+        """
+        self.id = id
+        self.index = index
+        self.file_id = file_id
+        self.size = file_id.file_size
+        self.chunk_size = chunk_size
+        self.max_parts = max_parts
+        self.parts: "OrderedDict[int, bytes]" = OrderedDict()
+
+    @classmethod
+    async def open(cls, id: int) -> "MediaReader":
+        index = pick_client(id)
+        return cls(id, index, await get_streamer(index).get_file_properties(id))
+
+    def fetch(self, offset: int, first_part_cut: int, last_part_cut: int, part_count: int):
+        return get_streamer(self.index).yield_file(
+            self.file_id, self.index, offset, first_part_cut, last_part_cut, part_count, self.chunk_size
+        )
+
+    async def load(self, first: int, count: int) -> None:
+        offset = first * self.chunk_size
+        if disk_cache:
+            parts = disk_cache.yield_file(
+                self.file_id.media_id, self.size, offset, 0, self.chunk_size, count, self.fetch
+            )
+        else:
+            parts = self.fetch(offset, 0, self.chunk_size, count)
+        part = first
+        try:
+            async for chunk in parts:
+                self.parts[part] = chunk
+                self.parts.move_to_end(part)
+                part += 1
+        finally:
+            await parts.aclose()
+        if part < first + count:
+            raise StreamInterrupted
+
+    async def read(self, start: int, length: int) -> bytes:
+        """
+        Returns up to `length` bytes from `start`, fewer at the end of the file.
+        """
+        end = min(start + length, self.size)
+        if start >= end:
+            return b""
+        first, last = start // self.chunk_size, (end - 1) // self.chunk_size
+        missing = [part for part in range(first, last + 1) if part not in self.parts]
+        if missing:
+            await self.load(missing[0], missing[-1] - missing[0] + 1)
+        data = b"".join(self.parts[part] for part in range(first, last + 1))
+        while len(self.parts) > self.max_parts:
+            self.parts.popitem(last=False)
+        cut = start - first * self.chunk_size
+        return data[cut:cut + end - start]
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
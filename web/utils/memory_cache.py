@@ -0,0 +1,57 @@
+from info import *
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+PartKey = Tuple[int, int, int]
+
+
+class HotChunkCache:
+    def __init__(self, max_bytes: int):
+        """
+        In-process LRU cache of Telegram parts keyed by (media_id, offset, limit),
+        shared by every ByteStreamer and kept under max_bytes.
+        """
+        self.max_bytes = max_bytes
+        self.parts: "OrderedDict[PartKey, bytes]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: PartKey) -> Optional[bytes]:
+        data = self.parts.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.parts.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: PartKey, data: bytes) -> None:
+        if not data or len(data) > self.max_bytes or key in self.parts:
+            return
+        self.parts[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, old = self.parts.popitem(last=False)
+            self.size -= len(old)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "parts": len(self.parts),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+hot_cache = HotChunkCache(MEMORY_CACHE_SIZE)
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
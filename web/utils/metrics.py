@@ -0,0 +1,154 @@
+import abc
+import asyncio
+from info import *
+from typing import Dict, List, Sequence, Tuple
+from web.server import multi_clients
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format(name: str, labels: Labels, value: float) -> str:
+    labels = (("worker", str(WORKER_ID)),) + labels
+    text = ",".join(f'{k}="{v}"' for k, v in labels)
+    if float(value).is_integer():
+        value = int(value)
+    return f"{name}{{{text}}} {value}"
+
+
+class Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        registry.append(self)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        pass
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = _labels(labels)
+        self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self) -> List[str]:
+        return [_format(self.name, labels, value) for labels, value in self.values.items()]
+
+
+class CollectedCounter(Counter):
+    """
+    Counter whose values are copied at scrape time from counts kept elsewhere,
+    such as the lookups a cache counts itself.
+    """
+
+    def set(self, value: float, **labels) -> None:
+        self.values[_labels(labels)] = value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.values[_labels(labels)] = value
+
+    def dec(self, value: float = 1, **labels) -> None:
+        self.inc(-value, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        # one count per bucket, then +Inf, then the sum
+        counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-2] += 1
+        counts[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, counts in self.values.items():
+            for bound, count in zip(self.buckets, counts):
+                lines.append(_format(f"{self.name}_bucket", labels + (("le", f"{bound:g}"),), count))
+            lines.append(_format(f"{self.name}_bucket", labels + (("le", "+Inf"),), counts[-2]))
+            lines.append(_format(f"{self.name}_sum", labels, counts[-1]))
+            lines.append(_format(f"{self.name}_count", labels, counts[-2]))
+        return lines
+
+
+registry: List[Metric] = []
+
+bytes_served = Counter("stream_bytes_served_total", "Bytes of media sent to viewers")
+responses = Counter("stream_responses_total", "Media responses started, by status and source")
+active_streams = Gauge("stream_active_responses", "Media responses currently being written")
+ttfb = Histogram("stream_ttfb_seconds", "Time from request to the first body byte written")
+getfile_latency = Histogram("telegram_getfile_seconds", "upload.GetFile round trip time")
+getfile_errors = Counter("telegram_getfile_errors_total", "Failed upload.GetFile attempts, by error")
+flood_waits = Counter("telegram_flood_waits_total", "FloodWait errors received")
+sessions_created = Counter("telegram_media_sessions_created_total", "Media sessions opened")
+failovers = Counter("stream_failovers_total", "Streams resumed on another client")
+loop_lag = Histogram("event_loop_lag_seconds", "Delay of a timer on the event loop", LAG_BUCKETS)
+
+# refreshed from the live state on every scrape
+client_streams = Gauge("client_active_streams", "Telegram downloads in progress (work_loads)")
+client_bytes_in_flight = Gauge("client_bytes_in_flight", "Bytes still to be fetched by running downloads")
+client_cooldown = Gauge("client_cooldown_seconds", "Remaining FloodWait cooldown of the client")
+media_sessions = Gauge("telegram_media_sessions", "Open media sessions")
+# the caches count their own lookups, these copy the counts since the worker started
+cache_hits = CollectedCounter("cache_hits_total", "Cache lookups that found the entry")
+cache_misses = CollectedCounter("cache_misses_total", "Cache lookups that missed")
+cache_bytes = Gauge("cache_bytes", "Bytes held by the cache")
+
+
+def client_label(client) -> str:
+    for index, other in multi_clients.items():
+        if other is client:
+            return str(index)
+    return "unknown"
+
+
+def render() -> str:
+    return "\n".join(line for metric in registry for line in metric.render()) + "\n"
+
+
+async def watch_loop_lag(interval: float = 0.5) -> None:
+    """
+    Measures how late a timer fires, which is how long callbacks wait for the loop.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        loop_lag.observe(max(loop.time() - expected, 0))
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -0,0 +1,98 @@
+from typing import Iterator, Optional, Tuple
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+# EBML (Matroska/WebM) parsing, just enough to find the Cues element through the
+# SeekHead at the start of the Segment.
+
+EBML = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+CUES = 0x1C53BB6B
+HEAD_SIZE = 64 * 1024
+
+
+def read_vint(data: bytes, pos: int, keep_marker: bool = False) -> Tuple[Optional[int], int]:
+    """
+    Reads a variable length integer at data[pos:]. Returns its value (None for the
+    reserved "unknown size") and its length in bytes.
+    """
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise ValueError("Corrupt EBML")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = value << 8 | byte
+    if not keep_marker and value == (1 << 7 * length) - 1:
+        return None, length
+    return value, length
+
+
+def read_element(data: bytes, pos: int) -> Tuple[int, int, Optional[int]]:
+    """
+    Returns the ID, header length and data size of the element at data[pos:].
+    """
+    element_id, id_length = read_vint(data, pos, keep_marker=True)
+    size, size_length = read_vint(data, pos + id_length)
+    return element_id, id_length + size_length, size
+
+
+def iter_elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yields the ID, data offset and data size of the elements in data[start:end]
+    whose size is known.
+    """
+    pos = start
+    while pos < end:
+        element_id, header, size = read_element(data, pos)
+        if size is None:
+            return
+        yield element_id, pos + header, size
+        pos += header + size
+
+
+async def cues_region(reader) -> Optional[Tuple[int, int]]:
+    """
+    Returns the offset and length of the Cues element, found through the SeekHead.
+    """
+    head = await reader.read(0, HEAD_SIZE)
+    element_id, header, size = read_element(head, 0)
+    if element_id != EBML:
+        return None
+    pos = header + size
+    element_id, header, _ = read_element(head, pos)
+    if element_id != SEGMENT:
+        return None
+    segment = pos + header
+
+    for element_id, start, size in iter_elements(head, segment, len(head)):
+        if element_id != SEEK_HEAD:
+            continue
+        for seek_id, seek_start, seek_size in iter_elements(head, start, min(start + size, len(head))):
+            if seek_id != SEEK:
+                continue
+            target = position = None
+            for field, field_start, field_size in iter_elements(head, seek_start, seek_start + seek_size):
+                value = int.from_bytes(head[field_start:field_start + field_size], "big")
+                if field == SEEK_ID:
+                    target = value
+                elif field == SEEK_POSITION:
+                    position = value
+            if target == CUES and position is not None:
+                cues = segment + position
+                element_id, header, size = read_element(await reader.read(cues, 12), 0)
+                if element_id != CUES or size is None:
+                    return None
+                return cues, header + size
+        return None
+    return None
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
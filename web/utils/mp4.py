@@ -0,0 +1,575 @@
+import sys
+import struct
+from array import array
+from typing import AsyncIterator, Callable, Iterator, List, NamedTuple, Optional
+from web.server.exceptions import UnsupportedMedia
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+# ISO BMFF (MP4) box parsing, just enough to find the index of a file: the moov
+# box with its tracks, and the fragments of a fragmented MP4 from its sidx, its
+# mfra or, as a last resort, by walking its moof boxes. The chunk offsets of a
+# moov can be rewritten to move it in front of the media data, and the sample
+# tables of a progressive MP4 read to cut it into fragments.
+
+MATROSKA_MAGIC = b"\x1a\x45\xdf\xa3"
+TOP_LEVEL = {"ftyp", "styp", "moov", "mdat", "free", "skip", "wide", "pdin", "uuid"}
+NON_SYNC_SAMPLE = 0x10000
+SAMPLE_TABLE_PATH = ("trak", "mdia", "minf", "stbl")
+
+
+class Box(NamedTuple):
+    type: str
+    start: int
+    header: int
+    size: int
+
+    @property
+    def body(self) -> int:
+        return self.start + self.header
+
+    @property
+    def end(self) -> int:
+        return self.start + self.size
+
+
+class Track(NamedTuple):
+    id: int
+    handler: str
+    timescale: int
+    duration: int
+    default_duration: int = 0
+    default_flags: int = 0
+
+
+class Movie(NamedTuple):
+    timescale: int
+    duration: int
+    tracks: List[Track]
+    fragmented: bool
+
+    def main_track(self) -> Track:
+        """
+        The track fragments are cut on: the video track if there is one.
+        """
+        for track in self.tracks:
+            if track.handler == "vide":
+                return track
+        if not self.tracks:
+            raise UnsupportedMedia("MP4 without tracks")
+        return self.tracks[0]
+
+
+class Fragment(NamedTuple):
+    start: int
+    size: int
+    duration: float
+    keyframe: bool = True
+
+
+class SampleTable(NamedTuple):
+    track: Track
+    trak: Box
+    offsets: array
+    sizes: array
+    times: array
+    composition: Optional[array]
+    sync: Optional[array]
+
+    @property
+    def count(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.offsets, self.sizes, self.times, self.composition, self.sync)
+        return sum(len(a) * a.itemsize for a in arrays if a is not None)
+
+
+def parse_header(data: bytes, pos: int, limit: int, base: int = 0) -> Optional[Box]:
+    """
+    Parses the box header at data[pos:]. Box offsets are data offsets plus base,
+    so a buffer read from the middle of a file reports file offsets. A size of 0
+    extends the box to limit.
+    """
+    if limit - pos < 8:
+        return None
+    size, kind = struct.unpack_from(">I4s", data, pos)
+    header = 8
+    if size == 1:
+        if limit - pos < 16:
+            return None
+        size = struct.unpack_from(">Q", data, pos + 8)[0]
+        header = 16
+    elif size == 0:
+        size = limit - pos
+    if size < header:
+        raise UnsupportedMedia("Corrupt MP4 box")
+    return Box(kind.decode("latin-1"), base + pos, header, size)
+
+
+def iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Box]:
+    end = len(data) if end is None else end
+    pos = start
+    while pos < end:
+        box = parse_header(data, pos, end)
+        if box is None:
+            return
+        yield box
+        pos = box.end
+
+
+def find_boxes(data: bytes, path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Box]:
+    """
+    Yields the boxes at a path like "trak/mdia/mdhd" below data[start:end].
+    """
+    kind, _, rest = path.partition("/")
+    for box in iter_boxes(data, start, end):
+        if box.type != kind:
+            continue
+        if rest:
+            yield from find_boxes(data, rest, box.body, box.end)
+        else:
+            yield box
+
+
+def find_box(data: bytes, path: str, start: int = 0, end: Optional[int] = None) -> Optional[Box]:
+    return next(find_boxes(data, path, start, end), None)
+
+
+def full_box(data: bytes, box: Box):
+    """
+    Returns the version, flags and body offset of a full box.
+    """
+    version_flags = struct.unpack_from(">I", data, box.body)[0]
+    return version_flags >> 24, version_flags & 0xFFFFFF, box.body + 4
+
+
+def parse_timescale(data: bytes, box: Box):
+    """
+    Returns the timescale and duration of an mvhd or mdhd box.
+    """
+    version, _, pos = full_box(data, box)
+    if version == 1:
+        return struct.unpack_from(">IQ", data, pos + 16)
+    return struct.unpack_from(">II", data, pos + 8)
+
+
+def parse_moov(data: bytes) -> Movie:
+    """
+    Parses the body of a moov box, given with its header.
+    """
+    moov = parse_header(data, 0, len(data))
+    mvhd = find_box(data, "mvhd", moov.body, moov.end)
+    if mvhd is None:
+        raise UnsupportedMedia("MP4 without mvhd")
+    timescale, duration = parse_timescale(data, mvhd)
+
+    defaults = {}
+    mvex = find_box(data, "mvex", moov.body, moov.end)
+    if mvex:
+        mehd = find_box(data, "mehd", mvex.body, mvex.end)
+        if mehd:
+            version, _, pos = full_box(data, mehd)
+            duration = struct.unpack_from(">Q" if version == 1 else ">I", data, pos)[0] or duration
+        for trex in find_boxes(data, "trex", mvex.body, mvex.end):
+            _, _, pos = full_box(data, trex)
+            track_id, _, default_duration, _, default_flags = struct.unpack_from(">5I", data, pos)
+            defaults[track_id] = (default_duration, default_flags)
+
+    tracks = []
+    for trak in find_boxes(data, "trak", moov.body, moov.end):
+        tkhd = find_box(data, "tkhd", trak.body, trak.end)
+        mdhd = find_box(data, "mdia/mdhd", trak.body, trak.end)
+        hdlr = find_box(data, "mdia/hdlr", trak.body, trak.end)
+        if not (tkhd and mdhd and hdlr):
+            continue
+        version, _, pos = full_box(data, tkhd)
+        track_id = struct.unpack_from(">I", data, pos + (16 if version == 1 else 8))[0]
+        track_timescale, track_duration = parse_timescale(data, mdhd)
+        handler = data[hdlr.body + 8:hdlr.body + 12].decode("latin-1")
+        tracks.append(Track(track_id, handler, track_timescale, track_duration, *defaults.get(track_id, (0, 0))))
+    return Movie(timescale, duration, tracks, mvex is not None)
+
+
+def parse_sidx(data: bytes, box: Box):
+    """
+    Returns the reference_ID of a sidx box given at data[0:], and its subsegments
+    as fragments with file offsets. Hierarchical indexes aren't supported.
+    """
+    version, _, pos = full_box(data, box)
+    reference_id, timescale = struct.unpack_from(">II", data, pos)
+    pos += 8
+    if version == 0:
+        _, first_offset = struct.unpack_from(">II", data, pos)
+        pos += 8
+    else:
+        _, first_offset = struct.unpack_from(">QQ", data, pos)
+        pos += 16
+    count = struct.unpack_from(">H", data, pos + 2)[0]
+    pos += 4
+
+    fragments = []
+    offset = box.end + first_offset
+    for n in range(count):
+        size, duration, sap = struct.unpack_from(">III", data, pos + n * 12)
+        if size >> 31:
+            raise UnsupportedMedia("Hierarchical sidx")
+        size &= 0x7FFFFFFF
+        fragments.append(Fragment(offset, size, duration / timescale, bool(sap >> 31)))
+        offset += size
+    return reference_id, fragments
+
+
+def parse_tfra(data: bytes, box: Box):
+    """
+    Returns the track_ID of a tfra box and its (time, moof offset) entries.
+    """
+    version, _, pos = full_box(data, box)
+    track_id, lengths, count = struct.unpack_from(">III", data, pos)
+    pos += 12
+    skip = ((lengths >> 4) & 3) + ((lengths >> 2) & 3) + (lengths & 3) + 3
+    entry = ">QQ" if version == 1 else ">II"
+    step = struct.calcsize(entry) + skip
+    entries = [struct.unpack_from(entry, data, pos + n * step) for n in range(count)]
+    return track_id, entries
+
+
+def read_array(typecode: str, data: bytes, pos: int, count: int) -> array:
+    """
+    Reads `count` big-endian integers at data[pos:].
+    """
+    values = array(typecode)
+    values.frombytes(data[pos:pos + count * values.itemsize])
+    if len(values) != count:
+        raise UnsupportedMedia("Truncated MP4 sample table")
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def parse_sample_table(data: bytes, trak: Box, track: Track) -> SampleTable:
+    """
+    Expands the sample tables (stsz, stsc with stco/co64, stts, ctts and stss) of
+    a trak into the file offset, size and decode time of every sample. The times
+    have one more entry, the end of the last sample.
+    """
+    stbl = find_box(data, "mdia/minf/stbl", trak.body, trak.end)
+    if stbl is None:
+        raise UnsupportedMedia("MP4 track without sample table")
+
+    def table(kind):
+        box = find_box(data, kind, stbl.body, stbl.end)
+        return box and full_box(data, box)
+
+    stsz = table("stsz")
+    if stsz is None:
+        raise UnsupportedMedia("MP4 track without stsz")
+    sample_size, count = struct.unpack_from(">II", data, stsz[2])
+    sizes = read_array("I", data, stsz[2] + 8, count) if sample_size == 0 else array("I", [sample_size]) * count
+
+    stco, co64 = table("stco"), table("co64")
+    if stco:
+        chunks = read_array("I", data, stco[2] + 4, struct.unpack_from(">I", data, stco[2])[0])
+    elif co64:
+        chunks = read_array("Q", data, co64[2] + 4, struct.unpack_from(">I", data, co64[2])[0])
+    else:
+        raise UnsupportedMedia("MP4 track without chunk offsets")
+
+    stsc = table("stsc")
+    if stsc is None:
+        raise UnsupportedMedia("MP4 track without stsc")
+    stsc_count = struct.unpack_from(">I", data, stsc[2])[0]
+    runs = [struct.unpack_from(">III", data, stsc[2] + 4 + n * 12) for n in range(stsc_count)]
+    offsets = array("Q")
+    for n, (first_chunk, per_chunk, _) in enumerate(runs):
+        last_chunk = runs[n + 1][0] - 1 if n + 1 < len(runs) else len(chunks)
+        for chunk in range(first_chunk - 1, min(last_chunk, len(chunks))):
+            offset = chunks[chunk]
+            for sample in range(len(offsets), min(len(offsets) + per_chunk, count)):
+                offsets.append(offset)
+                offset += sizes[sample]
+    if len(offsets) != count:
+        raise UnsupportedMedia("MP4 chunks don't match its samples")
+
+    stts = table("stts")
+    if stts is None:
+        raise UnsupportedMedia("MP4 track without stts")
+    times = array("Q", [0])
+    for n in range(struct.unpack_from(">I", data, stts[2])[0]):
+        run, delta = struct.unpack_from(">II", data, stts[2] + 4 + n * 8)
+        end = times[-1]
+        times.extend(range(end + delta, end + delta * run + 1, delta) if delta else [end] * run)
+        if len(times) > count:
+            break
+    if len(times) <= count:
+        raise UnsupportedMedia("MP4 sample durations don't match its samples")
+    del times[count + 1:]
+
+    composition = None
+    ctts = table("ctts")
+    if ctts:
+        version, _, pos = ctts
+        composition = array("q")
+        for n in range(struct.unpack_from(">I", data, pos)[0]):
+            run, offset = struct.unpack_from(">Ii" if version == 1 else ">II", data, pos + 4 + n * 8)
+            composition.extend([offset] * run)
+        del composition[count:]
+        composition.extend([0] * (count - len(composition)))
+
+    sync = None
+    stss = table("stss")
+    if stss:
+        sync = array("I", (n - 1 for n in read_array("I", data, stss[2] + 4, struct.unpack_from(">I", data, stss[2])[0])))
+    return SampleTable(track, trak, offsets, sizes, times, composition, sync)
+
+
+def sample_tables(data: bytes) -> List[SampleTable]:
+    """
+    Returns the sample tables of the video and audio tracks of a progressive MP4,
+    from its moov given with its header.
+    """
+    moov = parse_header(data, 0, len(data))
+    tracks = {track.id: track for track in parse_moov(data).tracks}
+    tables = []
+    for trak in find_boxes(data, "trak", moov.body, moov.end):
+        tkhd = find_box(data, "tkhd", trak.body, trak.end)
+        if tkhd is None:
+            continue
+        version, _, pos = full_box(data, tkhd)
+        track = tracks.get(struct.unpack_from(">I", data, pos + (16 if version == 1 else 8))[0])
+        if track is None or track.handler not in ("vide", "soun"):
+            continue
+        table = parse_sample_table(data, trak, track)
+        if table.count:
+            tables.append(table)
+    if not tables:
+        raise UnsupportedMedia("MP4 without audio or video samples")
+    return tables
+
+
+def parse_moof(data: bytes, track: Track):
+    """
+    Returns the duration in track timescale units of the samples of `track` in a
+    moof box given at data[0:], and whether its first sample is a sync sample.
+    """
+    moof = parse_header(data, 0, len(data))
+    for traf in find_boxes(data, "traf", moof.body, moof.end):
+        tfhd = find_box(data, "tfhd", traf.body, traf.end)
+        if tfhd is None:
+            continue
+        _, flags, pos = full_box(data, tfhd)
+        track_id = struct.unpack_from(">I", data, pos)[0]
+        if track_id != track.id:
+            continue
+        pos += 4
+        default_duration, default_flags = track.default_duration, track.default_flags
+        for flag, size in ((0x01, 8), (0x02, 4), (0x08, 4), (0x10, 4), (0x20, 4)):
+            if flags & flag:
+                if flag == 0x08:
+                    default_duration = struct.unpack_from(">I", data, pos)[0]
+                elif flag == 0x20:
+                    default_flags = struct.unpack_from(">I", data, pos)[0]
+                pos += size
+
+        duration = 0
+        first_flags = None
+        for trun in find_boxes(data, "trun", traf.body, traf.end):
+            _, flags, pos = full_box(data, trun)
+            count = struct.unpack_from(">I", data, pos)[0]
+            pos += 4
+            if flags & 0x001:
+                pos += 4
+            if flags & 0x004:
+                if first_flags is None:
+                    first_flags = struct.unpack_from(">I", data, pos)[0]
+                pos += 4
+            fields = [flag for flag in (0x100, 0x200, 0x400, 0x800) if flags & flag]
+            for n in range(count):
+                sample = struct.unpack_from(f">{len(fields)}I", data, pos + n * 4 * len(fields))
+                values = dict(zip(fields, sample))
+                duration += values.get(0x100, default_duration)
+                if first_flags is None and 0x400 in values:
+                    first_flags = values[0x400]
+        if first_flags is None:
+            first_flags = default_flags
+        return duration, not first_flags & NON_SYNC_SAMPLE
+    return 0, True
+
+
+def box_header(kind: str, body_size: int, header: int = 8) -> bytes:
+    """
+    Builds a box header, 16 bytes long (with a 64-bit size) when asked to or when
+    the box needs it.
+    """
+    if header == 16 or body_size + 8 > 0xFFFFFFFF:
+        return struct.pack(">I4sQ", 1, kind.encode("latin-1"), body_size + 16)
+    return struct.pack(">I4s", body_size + 8, kind.encode("latin-1"))
+
+
+def rewrite_chunk_offsets(data: bytes, start: int, end: int, move: Callable[[int], int], co64: bool, depth: int = 0) -> bytes:
+    """
+    Copies the boxes in data[start:end], the body of a moov, with every stco/co64
+    chunk offset passed through move. With co64 the stco boxes become co64 boxes
+    and the boxes above them grow to match; otherwise the copy is the same size,
+    and struct.error is raised if a moved offset doesn't fit in an stco.
+    """
+    out = bytearray()
+    for box in iter_boxes(data, start, end):
+        if depth < len(SAMPLE_TABLE_PATH) and box.type == SAMPLE_TABLE_PATH[depth]:
+            body = rewrite_chunk_offsets(data, box.body, box.end, move, co64, depth + 1)
+            out += box_header(box.type, len(body), box.header) + body
+        elif depth == len(SAMPLE_TABLE_PATH) and box.type in ("stco", "co64"):
+            version, flags, pos = full_box(data, box)
+            count = struct.unpack_from(">I", data, pos)[0]
+            offsets = struct.unpack_from(f">{count}{'I' if box.type == 'stco' else 'Q'}", data, pos + 4)
+            kind = "co64" if co64 or box.type == "co64" else "stco"
+            body = struct.pack(">II", version << 24 | flags, count) + struct.pack(
+                f">{count}{'I' if kind == 'stco' else 'Q'}", *map(move, offsets)
+            )
+            out += box_header(kind, len(body), box.header) + body
+        else:
+            out += data[box.start:box.end]
+    return bytes(out)
+
+
+def rewrite_moov(data: bytes, move: Callable[[int], int], co64: bool = False) -> bytes:
+    """
+    Returns a moov box, given with its header, with its chunk offsets moved.
+    """
+    moov = parse_header(data, 0, len(data))
+    body = rewrite_chunk_offsets(data, moov.body, moov.end, move, co64)
+    return box_header("moov", len(body), moov.header) + body
+
+
+async def read_box(reader, box: Box) -> bytes:
+    return await reader.read(box.start, box.size)
+
+
+async def top_level_boxes(reader, start: int = 0) -> AsyncIterator[Box]:
+    """
+    Walks the top-level boxes of the file from `start`, reading only their headers.
+    """
+    pos = start
+    while pos < reader.size:
+        box = parse_header(await reader.read(pos, 16), 0, reader.size - pos, pos)
+        if box is None:
+            return
+        yield box
+        pos = box.end
+
+
+async def find_moov(reader, max_boxes: int = 32) -> Optional[Box]:
+    """
+    Returns the top-level moov box wherever it is, reading only box headers.
+    """
+    count = 0
+    async for box in top_level_boxes(reader):
+        if box.type == "moov":
+            return box
+        count += 1
+        if box.type == "moof" or count >= max_boxes:
+            return None
+    return None
+
+
+async def read_head(reader):
+    """
+    Returns the moov of a fragmented MP4, the offset its init segment (ftyp and
+    moov) ends at, and the boxes between the moov and the first fragment.
+    """
+    if (await reader.read(0, 4)) == MATROSKA_MAGIC:
+        raise UnsupportedMedia("HLS needs a fragmented MP4, this file is Matroska")
+    moov = None
+    extra = []
+    async for box in top_level_boxes(reader):
+        if box.type == "moov":
+            moov = box
+        elif box.type in ("moof", "mdat"):
+            if moov is None:
+                break
+            return moov, box.start, extra
+        elif moov is not None:
+            extra.append(box)
+    raise UnsupportedMedia("HLS needs a fragmented MP4")
+
+
+async def fragment_index(reader):
+    """
+    Returns the length of the init segment of a fragmented MP4 and its fragments.
+    The sidx is used when there is one, then the mfra at the end of the file;
+    otherwise every moof is read, which costs a read per fragment.
+    """
+    moov_box, first_fragment, extra = await read_head(reader)
+    movie = parse_moov(await read_box(reader, moov_box))
+    if not movie.fragmented:
+        raise UnsupportedMedia("HLS needs a fragmented MP4")
+    track = movie.main_track()
+    init_end = moov_box.end
+
+    sidx_boxes = [box for box in extra if box.type == "sidx"]
+    indexes = {}
+    for box in sidx_boxes:
+        data = await read_box(reader, box)
+        try:
+            reference_id, fragments = parse_sidx(data, box._replace(start=0))
+        except UnsupportedMedia:
+            continue
+        # offsets are relative to the end of the sidx box
+        indexes[reference_id] = [f._replace(start=f.start + box.start) for f in fragments]
+    if indexes:
+        return init_end, indexes.get(track.id) or next(iter(indexes.values()))
+
+    fragments = await mfra_fragments(reader, movie, track)
+    if fragments:
+        return init_end, fragments
+
+    fragments = []
+    async for box in top_level_boxes(reader, first_fragment):
+        if box.type == "moof":
+            duration, keyframe = parse_moof(await read_box(reader, box), track)
+            fragments.append(Fragment(box.start, box.size, duration / track.timescale, keyframe))
+        elif box.type == "mfra":
+            break
+        elif fragments:
+            last = fragments[-1]
+            fragments[-1] = last._replace(size=box.end - last.start)
+    return init_end, fragments
+
+
+async def mfra_fragments(reader, movie: Movie, track: Track) -> List[Fragment]:
+    if reader.size < 16:
+        return []
+    mfro = await reader.read(reader.size - 16, 16)
+    if mfro[4:8] != b"mfro":
+        return []
+    mfra_start = reader.size - struct.unpack_from(">I", mfro, 12)[0]
+    if not 0 <= mfra_start < reader.size:
+        return []
+    data = await reader.read(mfra_start, reader.size - mfra_start)
+    mfra = parse_header(data, 0, len(data))
+    if mfra is None or mfra.type != "mfra":
+        return []
+
+    for tfra in find_boxes(data, "tfra", mfra.body, mfra.end):
+        track_id, entries = parse_tfra(data, tfra)
+        # a tfra lists every sync sample, several of them can be in one moof
+        entries = [entry for n, entry in enumerate(entries) if n == 0 or entry[1] != entries[n - 1][1]]
+        if track_id != track.id or not entries:
+            continue
+        total = movie.duration * track.timescale / movie.timescale if movie.timescale else 0
+        fragments = []
+        for n, (time, offset) in enumerate(entries):
+            if n + 1 < len(entries):
+                next_time, next_offset = entries[n + 1]
+            else:
+                next_time, next_offset = max(total, time), mfra_start
+            fragments.append(Fragment(offset, next_offset - offset, (next_time - time) / track.timescale))
+        if fragments[-1].duration <= 0 and len(fragments) > 1:
+            fragments[-1] = fragments[-1]._replace(duration=fragments[-2].duration)
+        return fragments
+    return []
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -1,19 +1,28 @@
+import hashlib
 import jinja2
 from info import *
-from web.server import Webmslandersbot
+from typing import Tuple
 from utils import get_size
-from web.utils.file_properties import get_file_ids
+from web.server.balancer import pick_client
 from web.server.exceptions import InvalidHash
+from web.utils.custom_dl import get_streamer
+from web.utils.ttl_cache import TTLCache
+from web.utils.static_assets import static_url
 import urllib.parse
 import logging
-import aiohttp
 
 #Dont Remove My Credit @MSLANDERS 
 # For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
 
+# templates are compiled once; they only change with a deploy
+template_env = jinja2.Environment(loader=jinja2.FileSystemLoader("web/template"), auto_reload=False)
+template_env.globals["static_url"] = static_url
+templates = {name: template_env.get_template(name) for name in ("webmslanders.html", "dl.html")}
+page_cache = TTLCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL)
+FASTSTART_MIME_TYPES = {"video/mp4", "video/quicktime", "video/x-m4v", "audio/mp4"}
+
 async def render_page(id, secure_hash, src=None):
-    file = await Webmslandersbot.get_messages(int(BIN_CHANNEL), int(id))
-    file_data = await get_file_ids(Webmslandersbot, int(BIN_CHANNEL), int(id))
+    file_data = await get_streamer(pick_client(id)).get_file_properties(int(id))
     if file_data.unique_id[:6] != secure_hash:
         logging.debug(f"link hash: {secure_hash} - {file_data.unique_id[:6]}")
         logging.debug(f"Invalid hash for message with - ID {id}")
@@ -23,25 +32,44 @@ async def render_page(id, secure_hash, src=None):
         URL,
         f"{id}?hash={secure_hash}",
     )
+    # the player gets moov-at-end MP4s remuxed so playback starts from the first request
+    player_src = src
+    if file_data.mime_type in FASTSTART_MIME_TYPES:
+        player_src = urllib.parse.urljoin(URL, f"faststart/{id}?hash={secure_hash}")
+    # with a poster the player has no need to fetch video bytes for a first frame
+    poster = ""
+    if getattr(file_data, "thumb_size", ""):
+        poster = urllib.parse.urljoin(URL, f"thumb/{id}?hash={secure_hash}")
 
-    tag = file_data.mime_type.split("/")[0].strip()
-    file_size = get_size(file_data.file_size)
+    tag = (file_data.mime_type or "").split("/")[0].strip()
     if tag in ["video", "audio"]:
-        template_file = "web/template/webmslanders.html"
+        template = templates["webmslanders.html"]
     else:
-        template_file = "web/template/dl.html"
-        async with aiohttp.ClientSession() as s:
-            async with s.get(src) as u:
-                file_size = get_size(int(u.headers.get("Content-Length")))
-
-    with open(template_file) as f:
-        template = jinja2.Template(f.read())
+        template = templates["dl.html"]
 
-    file_name = file_data.file_name.replace("_", " ")
+    file_name = (file_data.file_name or "").replace("_", " ")
 
     return template.render(
         file_name=file_name,
         file_url=src,
-        file_size=file_size,
+        player_url=player_src,
+        poster_url=poster,
+        file_size=get_size(file_data.file_size),
         file_unique_id=file_data.unique_id,
     )
+
+async def get_page(id, secure_hash) -> Tuple[str, str]:
+    """
+    Returns the watch page of a message and its ETag. Pages are cached by
+    (id, hash) for PAGE_CACHE_TTL seconds; wrong hashes are never cached.
+    """
+    key = (int(id), secure_hash)
+    page = page_cache.get(key)
+    if page is None:
+        html = await render_page(id, secure_hash)
+        page = (html, '"' + hashlib.blake2b(html.encode(), digest_size=12).hexdigest() + '"')
+        page_cache.set(key, page)
+    return page
+
+#Dont Remove My Credit @MSLANDERS 
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -2,13 +2,17 @@
 
 import asyncio
 import logging
+from pyrogram import Client
 from pyrogram.errors import FloodWait, RPCError
+from web.server.scheduler import get_scheduler
 
 log = logging.getLogger(__name__)
 
-async def safe_stream(func, *args, retries=5, **kwargs):
+async def safe_stream(func, *args, retries=5, client: Client = None, **kwargs):
     """
     Safely retry streaming/send/edit operations
+    Requests of `client` are paced by its scheduler, which also puts it in
+    cooldown on FloodWait.
     Handles:
     - Request timed out
     - FloodWait
@@ -19,6 +23,8 @@ async def safe_stream(func, *args, retries=5, **kwargs):
 
     while attempt < retries:
         try:
+            if client is not None:
+                return await get_scheduler(client).call(func, *args, **kwargs)
             return await func(*args, **kwargs)
 
         except FloodWait as e:
@@ -0,0 +1,240 @@
+import time
+import random
+import asyncio
+import logging
+from info import *
+from pyrogram import Client, raw
+from typing import Dict, List, Set
+from contextlib import asynccontextmanager
+from pyrogram.session import Session, Auth
+from pyrogram.errors import AuthBytesInvalid
+from web.server.scheduler import get_scheduler
+from web.utils import metrics
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+
+class MediaSessionPool:
+    def __init__(self, client: Client):
+        """
+        Keeps up to MEDIA_SESSIONS_PER_DC media sessions per DC for one client.
+        Requests go to the least busy session, dead sessions are replaced by a
+        periodic ping and extra sessions are closed once they sit idle.
+        """
+        self.client = client
+        self.sessions: Dict[int, List[Session]] = {}
+        self.requests: Dict[Session, int] = {}
+        self.last_used: Dict[Session, float] = {}
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.created = 0
+        self.replaced = 0
+        self.reaped = 0
+        self.warm_task = None
+        self.warm_ups: Set[asyncio.Task] = set()
+        self.health_task = None
+
+    async def open_session(self, dc_id: int) -> Session:
+        """
+        Starts a media session for the DC, exporting the authorization if it is
+        not the client's home DC.
+        """
+        client = self.client
+        test_mode = await client.storage.test_mode()
+
+        if dc_id != await client.storage.dc_id():
+            session = Session(
+                client, dc_id, await Auth(client, dc_id, test_mode).create(), test_mode, is_media=True
+            )
+            await session.start()
+
+            for _ in range(6):
+                exported_auth = await get_scheduler(client).call(
+                    client.invoke, raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+                )
+                try:
+                    await session.send(
+                        raw.functions.auth.ImportAuthorization(
+                            id=exported_auth.id,
+                            bytes=exported_auth.bytes,
+                        )
+                    )
+                    break
+                except AuthBytesInvalid:
+                    logging.debug(f"Invalid authorization bytes for DC {dc_id}")
+                    continue
+            else:
+                await session.stop()
+                raise AuthBytesInvalid
+        else:
+            session = Session(
+                client, dc_id, await client.storage.auth_key(), test_mode, is_media=True
+            )
+            await session.start()
+        return session
+
+    async def create_session(self, dc_id: int) -> Session:
+        session = await self.open_session(dc_id)
+        self.created += 1
+        metrics.sessions_created.inc(client=metrics.client_label(self.client), dc=dc_id)
+        self.requests[session] = 0
+        self.last_used[session] = time.monotonic()
+        logging.debug(f"Created media session for DC {dc_id}")
+        return session
+
+    async def get(self, dc_id: int) -> Session:
+        """
+        Returns the least busy session for the DC, opening another one when all of
+        them already carry MEDIA_SESSION_REQUESTS requests.
+        """
+        sessions = self.sessions.setdefault(dc_id, [])
+        if sessions:
+            session = min(sessions, key=self.requests.get)
+            if self.requests[session] < MEDIA_SESSION_REQUESTS or len(sessions) >= MEDIA_SESSIONS_PER_DC:
+                return session
+
+        async with self.locks.setdefault(dc_id, asyncio.Lock()):
+            if sessions:
+                session = min(sessions, key=self.requests.get)
+                if self.requests[session] < MEDIA_SESSION_REQUESTS or len(sessions) >= MEDIA_SESSIONS_PER_DC:
+                    return session
+            try:
+                session = await self.create_session(dc_id)
+            except Exception as e:
+                logging.error(f"Media session creation failed: {e}")
+                if sessions:
+                    return min(sessions, key=self.requests.get)
+                raise
+            sessions.append(session)
+            if dc_id not in requested_dcs:
+                requested_dcs.add(dc_id)
+                warm_up(dc_id)
+            return session
+
+    @asynccontextmanager
+    async def use(self, dc_id: int):
+        """
+        Leases the least busy session of the DC for one request.
+        """
+        session = await self.get(dc_id)
+        self.requests[session] = self.requests.get(session, 0) + 1
+        try:
+            yield session
+        finally:
+            self.requests[session] = self.requests.get(session, 1) - 1
+            self.last_used[session] = time.monotonic()
+
+    async def replace(self, dc_id: int, session: Session) -> None:
+        """
+        Drops a dead session from the pool and opens a new one in its place.
+        """
+        sessions = self.sessions.get(dc_id, [])
+        if session not in sessions:
+            return
+        sessions.remove(session)
+        self.replaced += 1
+        logging.warning(f"Replacing dead media session for DC {dc_id}")
+        await self.close(session)
+        try:
+            sessions.append(await self.create_session(dc_id))
+        except Exception as e:
+            logging.error(f"Media session creation failed: {e}")
+
+    async def close(self, session: Session) -> None:
+        self.requests.pop(session, None)
+        self.last_used.pop(session, None)
+        try:
+            await session.stop()
+        except Exception as e:
+            logging.debug(f"Error while stopping media session: {e}")
+
+    async def ping(self, session: Session) -> bool:
+        try:
+            await session.send(raw.functions.Ping(ping_id=random.getrandbits(63)), timeout=10)
+            return True
+        except Exception:
+            return False
+
+    async def check(self) -> None:
+        """
+        Pings every session, replaces the ones that don't answer and closes sessions
+        idle for MEDIA_SESSION_IDLE seconds, keeping one warm session per DC.
+        """
+        now = time.monotonic()
+        for dc_id, sessions in list(self.sessions.items()):
+            for session in list(sessions):
+                idle = now - self.last_used.get(session, now)
+                if len(sessions) > 1 and not self.requests.get(session) and idle > MEDIA_SESSION_IDLE:
+                    sessions.remove(session)
+                    self.reaped += 1
+                    logging.debug(f"Closing idle media session for DC {dc_id}")
+                    await self.close(session)
+                elif not await self.ping(session):
+                    await self.replace(dc_id, session)
+
+    async def health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MEDIA_SESSION_PING)
+            try:
+                await self.check()
+            except Exception as e:
+                logging.error(f"Media session health check failed: {e}")
+
+    async def start(self, dcs: List[int]) -> None:
+        """
+        Opens a session to the client's home DC and each of the given DCs, plus
+        the DCs already requested from other clients, and starts the health checks.
+        Other DCs are opened on their first request.
+        """
+        home = await self.client.storage.dc_id()
+        for dc_id in dict.fromkeys([home, *dcs, *requested_dcs]):
+            try:
+                await self.get(dc_id)
+            except Exception as e:
+                logging.warning(f"Couldn't warm up media session for DC {dc_id}: {e}")
+        if self.health_task is None:
+            self.health_task = asyncio.create_task(self.health_loop())
+
+    async def stop(self) -> None:
+        if self.health_task:
+            self.health_task.cancel()
+            self.health_task = None
+        for task in self.warm_ups:
+            task.cancel()
+        self.warm_ups.clear()
+        for sessions in self.sessions.values():
+            for session in sessions:
+                await self.close(session)
+        self.sessions.clear()
+
+
+pools: Dict[Client, MediaSessionPool] = {}
+# DCs files were requested from, warmed on every client: exporting the authorization
+# to all DCs at startup would cost each client an ExportAuthorization per DC
+requested_dcs: Set[int] = set()
+
+
+def get_pool(client: Client) -> MediaSessionPool:
+    if client not in pools:
+        pools[client] = MediaSessionPool(client)
+    return pools[client]
+
+
+def warm_up(dc_id: int) -> None:
+    """
+    Opens a session to the DC on every client that has none yet, in the background.
+    """
+    async def open_session(pool):
+        try:
+            await pool.get(dc_id)
+        except Exception as e:
+            logging.warning(f"Couldn't warm up media session for DC {dc_id}: {e}")
+
+    for pool in pools.values():
+        if not pool.sessions.get(dc_id) and pool.health_task is not None:
+            task = asyncio.create_task(open_session(pool))
+            pool.warm_ups.add(task)
+            task.add_done_callback(pool.warm_ups.discard)
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesces concurrent calls with the same key: the first caller starts the call
+        and every caller that arrives while it is running gets the same result. The
+        call is cancelled once every caller waiting for it has been cancelled.
+        """
+        self.calls: Dict[Hashable, asyncio.Future] = {}
+        self.waiters: Dict[asyncio.Future, int] = {}
+        self.coalesced = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.calls
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        call = self.calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func(*args, **kwargs))
+            self.calls[key] = call
+            call.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        # a cancelled waiter (e.g. a closed connection) must not cancel the shared call
+        # while others still wait for it, the last one to leave does
+        self.waiters[call] = self.waiters.get(call, 0) + 1
+        try:
+            return await asyncio.shield(call)
+        finally:
+            left = self.waiters.pop(call) - 1
+            if left:
+                self.waiters[call] = left
+            elif not call.done():
+                call.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future) -> None:
+        if self.calls.get(key) is call:
+            del self.calls[key]
+        if call.done() and not call.cancelled():
+            call.exception()
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
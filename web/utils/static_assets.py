@@ -0,0 +1,119 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import mimetypes
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+STATIC_DIR = "web/static"
+COMPRESSED = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+class StaticAsset:
+    def __init__(self, name: str, data: bytes, bodies: Dict[str, bytes]):
+        """
+        A file of web/static held in memory, with its compressed copies keyed by
+        Content-Encoding. It is served under a name containing a hash of its bytes,
+        so it can be cached forever.
+        """
+        self.name = name
+        self.digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.digest}{ext}"
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.bodies = dict(bodies, identity=data)
+
+    def negotiate(self, accept_encoding: str) -> Tuple[str, bytes, str]:
+        """
+        Returns the Content-Encoding, body and ETag of the smallest copy the client accepts.
+        """
+        accepted = set()
+        for coding in accept_encoding.lower().split(","):
+            coding, _, params = coding.partition(";")
+            params = params.replace(" ", "")
+            try:
+                weight = float(params[2:]) if params.startswith("q=") else 1
+            except ValueError:
+                weight = 1
+            if weight > 0:
+                accepted.add(coding.strip())
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and (encoding in accepted or "*" in accepted):
+                return encoding, self.bodies[encoding], f'"{self.digest}-{encoding}"'
+        return "identity", self.bodies["identity"], f'"{self.digest}"'
+
+
+class StaticAssets:
+    def __init__(self, directory: str):
+        """
+        Loads web/static at startup. Compressed copies written by vendor_assets.py
+        are used when they are newer than the file; otherwise they are made here.
+        """
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self.by_hash: Dict[str, StaticAsset] = {}
+        self.sources: Dict[str, str] = {}
+
+        manifest = os.path.join(directory, "assets.json")
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.sources = json.load(f)
+        if not os.path.isdir(directory):
+            return
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name == "assets.json" or name.endswith((".gz", ".br")) or not os.path.isfile(path):
+                continue
+            asset = self.load(name, path)
+            self.assets[name] = asset
+            self.by_hash[asset.hashed_name] = asset
+        logging.debug(f"Loaded {len(self.assets)} static assets")
+
+    def load(self, name: str, path: str) -> StaticAsset:
+        with open(path, "rb") as f:
+            data = f.read()
+        bodies = {}
+        content_type = mimetypes.guess_type(name)[0] or ""
+        if content_type.startswith(COMPRESSED):
+            for encoding, suffix, compress in (
+                ("br", ".br", brotli and (lambda data: brotli.compress(data, quality=5))),
+                ("gzip", ".gz", lambda data: gzip.compress(data, 6, mtime=0)),
+            ):
+                copy = path + suffix
+                if os.path.exists(copy) and os.path.getmtime(copy) >= os.path.getmtime(path):
+                    with open(copy, "rb") as f:
+                        bodies[encoding] = f.read()
+                elif compress:
+                    bodies[encoding] = compress(data)
+        return StaticAsset(name, data, bodies)
+
+    def get(self, hashed_name: str) -> Optional[StaticAsset]:
+        return self.by_hash.get(hashed_name)
+
+    def url(self, name: str) -> str:
+        """
+        The URL the templates use for an asset: our hashed copy, or its CDN URL
+        while it hasn't been vendored.
+        """
+        asset = self.assets.get(name)
+        if asset:
+            return f"/static/{asset.hashed_name}"
+        return self.sources[name]
+
+
+static_assets = StaticAssets(STATIC_DIR)
+
+def static_url(name: str) -> str:
+    return static_assets.url(name)
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
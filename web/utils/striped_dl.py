@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from info import *
+from typing import List, Tuple, Union
+from pyrogram.file_id import FileId
+from web.server import multi_clients, bytes_in_flight
+from web.utils.custom_dl import ByteStreamer, get_streamer
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+StripeWorker = Tuple[ByteStreamer, FileId, int]
+
+
+async def get_stripe_workers(id: int, index: int, file_id: FileId) -> List[StripeWorker]:
+    """
+    Picks up to STRIPE_CLIENTS clients for a striped download, starting with the
+    client already chosen for the request. Every extra client resolves its own FileId.
+    """
+    workers = [(get_streamer(index), file_id, index)]
+    others = sorted(
+        (i for i in multi_clients if i != index), key=lambda i: bytes_in_flight.get(i, 0)
+    )[:STRIPE_CLIENTS - 1]
+
+    async def resolve(i: int):
+        try:
+            streamer = get_streamer(i)
+            return streamer, await streamer.get_file_properties(id), i
+        except Exception as e:
+            logging.warning(f"Client {i} can't join striped download of {id}: {e}")
+
+    workers += [w for w in await asyncio.gather(*map(resolve, others)) if w]
+    return workers
+
+
+async def yield_striped(
+    workers: List[StripeWorker],
+    offset: int,
+    first_part_cut: int,
+    last_part_cut: int,
+    part_count: int,
+    chunk_size: int,
+) -> Union[bytes, None]:
+    """
+    Splits the parts of a range into stripes of STRIPE_PARTS parts, fetches them in
+    parallel with one stripe per client and yields the bytes back in order.
+    """
+    stripes = [
+        (start, min(STRIPE_PARTS, part_count - start))
+        for start in range(0, part_count, STRIPE_PARTS)
+    ]
+
+    async def fetch_stripe(k: int) -> List[bytes]:
+        streamer, file_id, index = workers[k % len(workers)]
+        start, count = stripes[k]
+        return [
+            chunk async for chunk in streamer.yield_file(
+                file_id, index, offset + start * chunk_size, 0, chunk_size, count, chunk_size
+            )
+        ]
+
+    pending = [asyncio.ensure_future(fetch_stripe(k)) for k in range(min(len(workers), len(stripes)))]
+    next_stripe = len(pending)
+
+    try:
+        for k, (start, count) in enumerate(stripes):
+            parts = await pending.pop(0)
+            if next_stripe < len(stripes):
+                pending.append(asyncio.ensure_future(fetch_stripe(next_stripe)))
+                next_stripe += 1
+
+            if len(parts) != count:
+                logging.error(f"Stripe {k} returned {len(parts)}/{count} parts, stopping")
+                return
+
+            for n, chunk in enumerate(parts, start):
+                if part_count == 1:
+                    yield chunk[first_part_cut:last_part_cut]
+                elif n == 0:
+                    yield chunk[first_part_cut:]
+                elif n == part_count - 1:
+                    yield chunk[:last_part_cut]
+                else:
+                    yield chunk
+
+    finally:
+        for task in pending:
+            task.cancel()
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
@@ -0,0 +1,104 @@
+import io
+import asyncio
+import logging
+from info import *
+from typing import NamedTuple, Optional
+from pyrogram.file_id import FileId
+from web.server.balancer import pick_client
+from web.server.exceptions import FIleNotFound, InvalidHash
+from web.utils.custom_dl import ByteStreamer, get_streamer
+from web.utils.single_flight import SingleFlight
+from web.utils.ttl_cache import TTLCache, NEGATIVE
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+thumbnails = TTLCache(THUMB_CACHE_SIZE, THUMB_CACHE_TTL, FILE_CACHE_NEGATIVE_TTL)
+thumb_flights = SingleFlight()
+
+
+class Thumbnail(NamedTuple):
+    data: bytes
+    content_type: str
+    etag: str
+
+
+def image_type(data: bytes) -> str:
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    return "application/octet-stream"
+
+
+def snap_width(width: Optional[int]) -> int:
+    """
+    Rounds a requested width up to one of THUMB_WIDTHS, so a handful of sizes
+    are resized and cached. 0 means the thumbnail as Telegram sent it.
+    """
+    if not width or Image is None:
+        return 0
+    return next((w for w in sorted(THUMB_WIDTHS) if w >= width), 0)
+
+
+def resize(data: bytes, width: int) -> bytes:
+    """
+    Scales a thumbnail down to `width` as a JPEG. Narrower thumbnails are returned
+    unchanged.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= width:
+            return data
+        image = image.convert("RGB")
+        image.thumbnail((width, image.height))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=85, optimize=True)
+        return out.getvalue()
+
+
+async def build_thumbnail(streamer: ByteStreamer, file_id: FileId, width: int) -> Optional[Thumbnail]:
+    data = await streamer.get_thumbnail(file_id)
+    if not data:
+        return None
+    if width:
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(None, resize, data, width)
+        except OSError as e:
+            logging.warning(f"Couldn't resize the thumbnail of message {file_id.message_id}: {e}")
+    return Thumbnail(data, image_type(data), f'"{file_id.unique_id}-thumb{width or ""}"')
+
+
+async def get_thumbnail(id: int, secure_hash: str, width: Optional[int] = None) -> Thumbnail:
+    """
+    Returns the Telegram thumbnail of a message, resized to the THUMB_WIDTHS
+    entry nearest above `width` when Pillow is installed. Thumbnails, and
+    messages without one, are cached per media and width.
+    """
+    streamer = get_streamer(pick_client(id))
+    file_id = await streamer.get_file_properties(id)
+    if file_id.unique_id[:6] != secure_hash:
+        raise InvalidHash
+
+    width = snap_width(width)
+    key = (file_id.media_id, width)
+    thumb = thumbnails.get(key)
+    if thumb is NEGATIVE:
+        raise FIleNotFound
+    if thumb is None:
+        thumb = await thumb_flights.do(key, build_thumbnail, streamer, file_id, width)
+        if thumb is None:
+            thumbnails.set_negative(key)
+            raise FIleNotFound
+        thumbnails.set(key, thumb)
+    return thumb
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
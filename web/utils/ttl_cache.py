@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP
+
+NEGATIVE = object()
+
+
+class TTLCache:
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        negative_ttl: float = 0,
+        max_bytes: int = 0,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ):
+        """
+        LRU cache whose entries expire ttl seconds after they were set. Misses can be
+        remembered with set_negative for negative_ttl seconds; get returns NEGATIVE for them.
+        With max_bytes, entries are also evicted once the sizes given by weigh add up
+        past it, and values larger than max_bytes aren't kept at all.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.weigh = weigh
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.weights: Dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] > time.monotonic() and entry[1] is not NEGATIVE
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        if value is NEGATIVE:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        weight = self.weigh(value) if self.max_bytes and value is not NEGATIVE else 0
+        self._drop(key)
+        if self.max_bytes and weight > self.max_bytes:
+            return
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        if weight:
+            self.weights[key] = weight
+            self.bytes += weight
+        while len(self.entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def set_negative(self, key: Hashable) -> None:
+        if self.negative_ttl > 0:
+            self.set(key, NEGATIVE, self.negative_ttl)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._drop(key)
+        return entry and entry[1]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.weights.clear()
+        self.bytes = 0
+
+    def _drop(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        self.bytes -= self.weights.pop(key, 0)
+        return self.entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        stats = {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+        if self.max_bytes:
+            stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        return stats
+
+#Dont Remove My Credit @MSLANDERS
+# For Any Kind Of Error Ask Us In Support Group @MSLANDERS_HELP